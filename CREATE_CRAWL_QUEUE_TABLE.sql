@@ -23,6 +23,29 @@ CREATE TABLE IF NOT EXISTS crawl_queue (
 CREATE INDEX IF NOT EXISTS idx_queue_session_status ON crawl_queue(session_id, status);
 CREATE INDEX IF NOT EXISTS idx_queue_priority ON crawl_queue(priority DESC, depth ASC);
 
+-- Atomically claim up to n pending URLs for a worker.
+-- FOR UPDATE SKIP LOCKED lets several workers claim batches at the same
+-- time without ever handing out the same row twice.
+CREATE OR REPLACE FUNCTION claim_queue_batch(sid UUID DEFAULT NULL, n INTEGER DEFAULT 8)
+RETURNS SETOF crawl_queue
+LANGUAGE sql
+AS $$
+  UPDATE crawl_queue
+  SET status = 'processing', updated_at = NOW()
+  WHERE id IN (
+    SELECT q.id FROM crawl_queue q
+    JOIN crawl_sessions s ON s.id = q.session_id
+    WHERE q.status = 'pending'
+      AND (sid IS NULL OR q.session_id = sid)
+      -- Finished sessions (e.g. max_pages reached) hand out no more work
+      AND s.status NOT IN ('completed', 'failed')
+    ORDER BY q.priority DESC, q.created_at
+    LIMIT n
+    FOR UPDATE OF q SKIP LOCKED
+  )
+  RETURNING *;
+$$;
+
 -- ================================================================
 -- DONE! You can now use the production crawler
 -- ================================================================
@@ -0,0 +1,47 @@
+-- =====================================================
+-- ADD: crawl_queue RPC functions for saas_worker.py
+-- =====================================================
+-- Run this if your crawl_queue table was created by an
+-- older SETUP_ENGINE.sql. saas_worker.py claims tasks with
+-- claim_crawl_tasks and writes statuses with
+-- crawl_queue_bulk_update. Safe to run more than once.
+-- =====================================================
+
+-- Columns the functions write (present in current SETUP_ENGINE.sql)
+ALTER TABLE crawl_queue ADD COLUMN IF NOT EXISTS processed_at TIMESTAMPTZ;
+ALTER TABLE crawl_queue ADD COLUMN IF NOT EXISTS completed_at TIMESTAMPTZ;
+
+-- Atomically claim up to n pending URLs of a session
+-- FOR UPDATE SKIP LOCKED lets several workers claim at the same time
+-- without ever handing out the same row twice
+CREATE OR REPLACE FUNCTION claim_crawl_tasks(sess UUID, n INTEGER)
+RETURNS SETOF crawl_queue
+LANGUAGE sql
+AS $$
+  UPDATE crawl_queue
+  SET status = 'processing', processed_at = NOW()
+  WHERE id IN (
+    SELECT id FROM crawl_queue
+    WHERE session_id = sess AND status = 'pending'
+    ORDER BY depth ASC
+    LIMIT n
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING *;
+$$;
+
+-- Apply many task status updates in one statement
+CREATE OR REPLACE FUNCTION crawl_queue_bulk_update(ids UUID[], statuses TEXT[], timestamps TIMESTAMPTZ[])
+RETURNS VOID
+LANGUAGE sql
+AS $$
+  UPDATE crawl_queue
+  SET status = data.status, completed_at = data.ts
+  FROM unnest(ids, statuses, timestamps) AS data(id, status, ts)
+  WHERE crawl_queue.id = data.id;
+$$;
+
+-- Verify the fix
+SELECT routine_name
+FROM information_schema.routines
+WHERE routine_name IN ('claim_crawl_tasks', 'crawl_queue_bulk_update');
@@ -0,0 +1,29 @@
+-- =====================================================
+-- ADD: html_gz column to pages table
+-- =====================================================
+-- The Python crawler worker stores page HTML gzip-compressed
+-- and base64-encoded in html_gz instead of raw text in html.
+-- To read it back:
+--   gzip.decompress(base64.b64decode(html_gz)).decode('utf-8')
+-- =====================================================
+
+DO $$ 
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 
+        FROM information_schema.columns 
+        WHERE table_name='pages' 
+        AND column_name='html_gz'
+    ) THEN
+        ALTER TABLE pages ADD COLUMN html_gz TEXT;
+        RAISE NOTICE 'Added html_gz column to pages table';
+    ELSE
+        RAISE NOTICE 'html_gz column already exists';
+    END IF;
+END $$;
+
+-- Verify the fix
+SELECT column_name, data_type 
+FROM information_schema.columns 
+WHERE table_name = 'pages'
+ORDER BY ordinal_position;
@@ -17,16 +17,24 @@ Example:
     python PYTHON_DB_WORKER.py my-proj-123 https://example.com --max-pages 1000 --max-depth 5
 
 Requirements:
-    pip install requests beautifulsoup4 lxml
+    pip install aiohttp aiolimiter beautifulsoup4 lxml ada-url
 """
 
-import requests
+import asyncio
+import aiohttp
 import sys
-import time
+from aiolimiter import AsyncLimiter
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 import re
 
+try:
+    # WHATWG URL parser (C++), much faster than urllib.parse
+    from ada_url import URL, join_url
+except ImportError:
+    URL = None
+    join_url = urljoin
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -38,6 +46,22 @@ BACKEND_URL = "https://YOUR_PROJECT.supabase.co/functions/v1/make-server-4180e2c
 # Supabase Anon Key (public key, safe to use)
 ANON_KEY = "YOUR_SUPABASE_ANON_KEY"
 
+# Number of pages fetched in parallel
+CONCURRENCY = 20
+
+# Politeness: max requests per second to any single host
+HOST_REQUESTS_PER_SECOND = 2
+
+# Stop downloading a page after this much (decoded) HTML
+MAX_HTML_BYTES = 512 * 1024
+
+# Idempotent backend calls failing with these statuses are retried with backoff
+BACKEND_RETRIES = 3
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# Links with these prefixes are never crawled
+SKIP_PREFIXES = ('#', 'javascript:', 'mailto:', 'tel:', 'data:', 'sms:')
+
 # ============================================================================
 # HTTP CLIENT
 # ============================================================================
@@ -45,14 +69,31 @@ ANON_KEY = "YOUR_SUPABASE_ANON_KEY"
 class BackendClient:
     """Handles all communication with the Supabase backend"""
     
-    def __init__(self, backend_url, anon_key):
+    def __init__(self, backend_url, anon_key, connector):
         self.backend_url = backend_url
         self.headers = {
             'Authorization': f'Bearer {anon_key}',
             'Content-Type': 'application/json'
         }
+        # Keep-alive session on the shared connection pool
+        self.session = aiohttp.ClientSession(connector=connector, connector_owner=False, headers=self.headers)
+        # Older backends have no /submit-next route; we fall back to /submit + /next
+        self.submit_next_supported = True
+    
+    async def close(self):
+        await self.session.close()
     
-    def initialize_crawl(self, project_id, start_url, max_pages=1000, max_depth=5):
+    async def _request(self, method, url, **kwargs):
+        """Send a request and return the JSON body, retrying transient 5xx errors on GET"""
+        retries = BACKEND_RETRIES if method == 'GET' else 0
+        for attempt in range(retries + 1):
+            async with self.session.request(method, url, **kwargs) as response:
+                if response.status not in RETRY_STATUSES or attempt == retries:
+                    response.raise_for_status()
+                    return await response.json()
+            await asyncio.sleep(0.3 * 2 ** attempt)
+    
+    async def initialize_crawl(self, project_id, start_url, max_pages=1000, max_depth=5):
         """Initialize crawl session and queue homepage"""
         url = f"{self.backend_url}/projects/{project_id}/crawl/db-init"
         payload = {
@@ -62,10 +103,8 @@ class BackendClient:
         }
         
         print(f"🔧 Initializing crawl session...")
-        response = requests.post(url, json=payload, headers=self.headers)
-        response.raise_for_status()
+        data = await self._request('POST', url, json=payload)
         
-        data = response.json()
         if not data.get('success'):
             raise Exception(f"Init failed: {data.get('error')}")
         
@@ -73,20 +112,18 @@ class BackendClient:
         print(f"✅ Session created: {session_id}")
         return session_id
     
-    def get_next_url(self, session_id):
+    async def get_next_url(self, session_id):
         """Request next pending URL to crawl"""
         url = f"{self.backend_url}/crawl/sessions/{session_id}/next"
         
-        response = requests.post(url, headers=self.headers)
-        response.raise_for_status()
+        data = await self._request('POST', url)
         
-        data = response.json()
         if not data.get('success'):
             raise Exception(f"Get next failed: {data.get('error')}")
         
         return data.get('data')  # None if no URLs left
     
-    def submit_results(self, session_id, task_id, url, title, content, links, status=200, error=None, max_depth=5):
+    async def submit_results(self, session_id, task_id, url, title, content, links, status=200, error=None, max_depth=5):
         """Submit crawled page data and discovered links"""
         url_endpoint = f"{self.backend_url}/crawl/sessions/{session_id}/submit"
         payload = {
@@ -100,23 +137,56 @@ class BackendClient:
             'maxDepth': max_depth
         }
         
-        response = requests.post(url_endpoint, json=payload, headers=self.headers)
-        response.raise_for_status()
+        data = await self._request('POST', url_endpoint, json=payload)
         
-        data = response.json()
         if not data.get('success'):
             raise Exception(f"Submit failed: {data.get('error')}")
         
         return data.get('data', {})
     
-    def get_stats(self, session_id):
+    async def submit_and_next(self, session_id, task_id, url, title, content, links, status=200, error=None, max_depth=5):
+        """
+        Submit crawled page data and claim the next URL in one round-trip
+        Returns: (result, next_task, stats) - next_task is None if no URLs left,
+        stats is None when the backend lacks /submit-next (two calls are made instead)
+        """
+        if not self.submit_next_supported:
+            result = await self.submit_results(session_id, task_id, url, title, content, links, status, error, max_depth)
+            return result, await self.get_next_url(session_id), None
+        
+        url_endpoint = f"{self.backend_url}/crawl/sessions/{session_id}/submit-next"
+        payload = {
+            'taskId': task_id,
+            'url': url,
+            'title': title,
+            'content': content,
+            'links': links,
+            'status': status,
+            'error': error,
+            'maxDepth': max_depth
+        }
+        
+        try:
+            data = await self._request('POST', url_endpoint, json=payload)
+        except aiohttp.ClientResponseError as e:
+            if e.status != 404:
+                raise
+            print("ℹ️  Backend has no /submit-next, using /submit + /next")
+            self.submit_next_supported = False
+            return await self.submit_and_next(session_id, task_id, url, title, content, links, status, error, max_depth)
+        
+        if not data.get('success'):
+            raise Exception(f"Submit failed: {data.get('error')}")
+        
+        data = data.get('data') or {}
+        return data.get('result', {}), data.get('nextTask'), data.get('stats', {})
+    
+    async def get_stats(self, session_id):
         """Get crawl statistics"""
         url = f"{self.backend_url}/crawl/sessions/{session_id}/stats"
         
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
+        data = await self._request('GET', url)
         
-        data = response.json()
         return data.get('data', {})
 
 # ============================================================================
@@ -126,13 +196,23 @@ class BackendClient:
 class WebCrawler:
     """Crawls a single page and extracts links"""
     
-    def __init__(self, base_url):
+    def __init__(self, base_url, connector):
         self.base_url = base_url
-        self.domain = urlparse(base_url).netloc
+        # Keep-alive session on the shared connection pool, bot user-agent preset
+        self.session = aiohttp.ClientSession(connector=connector, connector_owner=False, headers={
+            'User-Agent': 'Internal-Link-Analyzer-Bot/1.0'
+        })
+        self.domain = url_host(base_url)
+        self._limiters: dict[str, AsyncLimiter] = {}
     
     def normalize_url(self, url):
         """Normalize URL for consistent comparison"""
         try:
+            if URL is not None:
+                parsed = URL(url)
+                # Drop fragment and trailing slashes, host is already lowercased
+                return f"{parsed.protocol}//{parsed.host}{parsed.pathname.rstrip('/')}{parsed.search}"
+            
             parsed = urlparse(url)
             # Remove trailing slashes from path
             path = parsed.path.rstrip('/')
@@ -147,35 +227,40 @@ class WebCrawler:
     def is_internal_link(self, url):
         """Check if URL is internal (same domain)"""
         try:
-            parsed = urlparse(url)
-            return parsed.netloc == self.domain or parsed.netloc == ''
+            host = url_host(url)
+            return host == self.domain or host == ''
         except:
             return False
     
-    def extract_links(self, html, current_url):
-        """Extract all internal links from HTML"""
-        soup = BeautifulSoup(html, 'lxml')
+    def extract_links_from_soup(self, soup, current_url):
+        """Extract all internal links from an already parsed page"""
+        seen = set()
         links = []
         
         for a_tag in soup.find_all('a', href=True):
             href = a_tag['href']
             
             # Skip anchors, javascript, mailto, tel, etc.
-            if href.startswith('#') or href.startswith('javascript:') or href.startswith('mailto:') or href.startswith('tel:'):
+            if not href or href.startswith(SKIP_PREFIXES):
                 continue
             
             # Convert relative URLs to absolute
-            absolute_url = urljoin(current_url, href)
+            try:
+                absolute_url = join_url(current_url, href)
+            except ValueError:
+                continue
             
             # Only keep internal links
             if self.is_internal_link(absolute_url):
                 normalized = self.normalize_url(absolute_url)
-                if normalized not in links:
-                    links.append(normalized)
+                if normalized in seen:
+                    continue
+                seen.add(normalized)
+                links.append(normalized)
         
         return links
     
-    def crawl_page(self, url):
+    async def crawl_page(self, url):
         """
         Crawl a single page and extract data
         Returns: (title, content, links, status_code, error)
@@ -183,33 +268,15 @@ class WebCrawler:
         try:
             print(f"  🌐 Fetching: {url}")
             
-            response = requests.get(url, timeout=15, headers={
-                'User-Agent': 'Internal-Link-Analyzer-Bot/1.0'
-            })
-            
-            status_code = response.status_code
+            async with self._limiter(url):
+                html, status_code = await fetch(self.session, url)
             
             if status_code != 200:
                 return None, None, [], status_code, f"HTTP {status_code}"
             
-            html = response.text
             soup = BeautifulSoup(html, 'lxml')
             
-            # Extract title
-            title_tag = soup.find('title')
-            title = title_tag.get_text(strip=True) if title_tag else 'Untitled'
-            
-            # Extract text content (simple version)
-            # Remove script and style tags
-            for script in soup(['script', 'style']):
-                script.decompose()
-            
-            text = soup.get_text(separator=' ', strip=True)
-            # Limit content to 10000 characters
-            content = text[:10000]
-            
-            # Extract internal links
-            links = self.extract_links(html, url)
+            title, content, links = self._extract_all(soup, url)
             
             print(f"  ✅ Title: {title}")
             print(f"  📋 Found {len(links)} internal links")
@@ -219,6 +286,61 @@ class WebCrawler:
         except Exception as e:
             print(f"  ❌ Error: {str(e)}")
             return None, None, [], 0, str(e)
+    
+    async def close(self):
+        await self.session.close()
+    
+    def _limiter(self, url):
+        """Rate limiter shared by every request to the URL's host"""
+        host = url_host(url)
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            limiter = self._limiters[host] = AsyncLimiter(HOST_REQUESTS_PER_SECOND, 1)
+        return limiter
+    
+    def _extract_all(self, soup, current_url):
+        """Extract (title, content, links) from a single parsed tree"""
+        # Extract title
+        title_tag = soup.find('title')
+        title = title_tag.get_text(strip=True) if title_tag else 'Untitled'
+        
+        # Remove script and style tags (shared by text and link extraction)
+        for script in soup(['script', 'style']):
+            script.decompose()
+        
+        # Extract text content (simple version)
+        text = soup.get_text(separator=' ', strip=True)
+        # Limit content to 10000 characters
+        content = text[:10000]
+        
+        # Extract internal links
+        links = self.extract_links_from_soup(soup, current_url)
+        
+        return title, content, links
+
+def url_host(url):
+    """Host (including port) of an absolute URL"""
+    if URL is not None:
+        return URL(url).host
+    return urlparse(url).netloc
+
+async def fetch(session, url):
+    """Download up to MAX_HTML_BYTES of a page, returns (html, status_code)"""
+    async with session.get(url, timeout=aiohttp.ClientTimeout(total=15)) as response:
+        if response.status != 200:
+            return None, response.status
+        
+        # Body is streamed already decompressed, so the cap is on decoded bytes
+        chunks = []
+        total = 0
+        async for chunk in response.content.iter_chunked(16384):
+            chunks.append(chunk)
+            total += len(chunk)
+            if total >= MAX_HTML_BYTES:
+                break
+        
+        html = b''.join(chunks).decode(response.charset or 'utf-8', errors='replace')
+        return html, response.status
 
 # ============================================================================
 # MAIN WORKER LOOP
@@ -253,38 +375,67 @@ def main():
     print("=" * 70)
     print()
     
-    # Initialize clients
-    backend = BackendClient(BACKEND_URL, ANON_KEY)
-    crawler = WebCrawler(start_url)
-    
+    asyncio.run(run(project_id, start_url, max_pages, max_depth))
+
+async def run(project_id, start_url, max_pages, max_depth):
+    # One pooled connector shared by the backend and the crawler so TLS
+    # connections are kept alive and reused across requests
+    connector = aiohttp.TCPConnector(limit=32, limit_per_host=8, keepalive_timeout=60)
+    backend = BackendClient(BACKEND_URL, ANON_KEY, connector)
+    crawler = WebCrawler(start_url, connector)
+    try:
+        await crawl(backend, crawler, project_id, start_url, max_pages, max_depth)
+    finally:
+        await backend.close()
+        await crawler.close()
+        await connector.close()
+
+async def crawl(backend, crawler, project_id, start_url, max_pages, max_depth):
     # Initialize session
     try:
-        session_id = backend.initialize_crawl(project_id, start_url, max_pages, max_depth)
+        session_id = await backend.initialize_crawl(project_id, start_url, max_pages, max_depth)
     except Exception as e:
         print(f"❌ Failed to initialize: {e}")
         sys.exit(1)
     
     print()
-    print("🚀 Starting crawl loop...")
+    print(f"🚀 Starting crawl loop ({CONCURRENCY} concurrent fetches)...")
     print()
     
+    queue = asyncio.Queue(maxsize=CONCURRENCY)
     pages_crawled = 0
+    in_flight = 0
     
-    # Main crawl loop
-    while True:
-        # Get next URL to crawl
-        try:
-            task = backend.get_next_url(session_id)
-        except Exception as e:
-            print(f"❌ Error getting next URL: {e}")
-            time.sleep(2)
-            continue
+    async def produce():
+        """Feed pending URLs from the backend into the local queue"""
+        while True:
+            # Get next URL to crawl
+            try:
+                task = await backend.get_next_url(session_id)
+            except Exception as e:
+                print(f"❌ Error getting next URL: {e}")
+                await asyncio.sleep(2)
+                continue
+            
+            if task:
+                await queue.put(task)
+                continue
+            
+            # No more URLs and nothing being crawled? Done!
+            if queue.empty() and in_flight == 0:
+                print()
+                print("🏁 No more URLs to crawl. Queue is empty!")
+                break
+            
+            # Pages still in flight may enqueue more links
+            await asyncio.sleep(1)
         
-        # No more URLs? Done!
-        if not task:
-            print()
-            print("🏁 No more URLs to crawl. Queue is empty!")
-            break
+        for _ in range(CONCURRENCY):
+            await queue.put(None)
+    
+    async def process(task):
+        """Crawl one task, returns the next task handed back by the backend"""
+        nonlocal pages_crawled
         
         task_id = task['taskId']
         url = task['url']
@@ -293,11 +444,13 @@ def main():
         print(f"📄 [{pages_crawled + 1}] Depth {depth}: {url}")
         
         # Crawl the page
-        title, content, links, status, error = crawler.crawl_page(url)
+        title, content, links, status, error = await crawler.crawl_page(url)
         
-        # Submit results to backend
+        # Submit results to backend and get the next URL in the same call
+        next_task = None
+        stats = None
         try:
-            result = backend.submit_results(
+            result, next_task, stats = await backend.submit_and_next(
                 session_id=session_id,
                 task_id=task_id,
                 url=url,
@@ -320,22 +473,39 @@ def main():
         
         print()
         
-        # Small delay to avoid overwhelming the server
-        time.sleep(0.5)
+        # Every 10 pages, show the stats returned with the submit (or fetch them)
+        if stats is None and pages_crawled and pages_crawled % 10 == 0:
+            try:
+                stats = await backend.get_stats(session_id)
+            except Exception as e:
+                print(f"  ⚠️  Error fetching stats: {e}")
+        if stats and pages_crawled % 10 == 0:
+            print("-" * 70)
+            print(f"📊 STATS: Pending: {stats.get('pending', 0)} | "
+                  f"Completed: {stats.get('completed', 0)} | "
+                  f"Failed: {stats.get('failed', 0)} | "
+                  f"Total: {stats.get('total', 0)}")
+            print("-" * 70)
+            print()
         
-        # Every 10 pages, show stats
-        if pages_crawled % 10 == 0:
+        return next_task
+    
+    async def work():
+        nonlocal in_flight
+        while True:
+            task = await queue.get()
+            if task is None:
+                break
+            in_flight += 1
             try:
-                stats = backend.get_stats(session_id)
-                print("-" * 70)
-                print(f"📊 STATS: Pending: {stats.get('pending', 0)} | "
-                      f"Completed: {stats.get('completed', 0)} | "
-                      f"Failed: {stats.get('failed', 0)} | "
-                      f"Total: {stats.get('total', 0)}")
-                print("-" * 70)
-                print()
-            except:
-                pass
+                # Keep following the tasks returned by submit_and_next
+                while task:
+                    task = await process(task)
+            finally:
+                in_flight -= 1
+    
+    # Main crawl loop
+    await asyncio.gather(produce(), *[work() for _ in range(CONCURRENCY)])
     
     # Final stats
     print()
@@ -344,7 +514,7 @@ def main():
     print("=" * 70)
     
     try:
-        stats = backend.get_stats(session_id)
+        stats = await backend.get_stats(session_id)
         print(f"Pages Crawled:  {stats.get('completed', 0)}")
         print(f"Failed:         {stats.get('failed', 0)}")
         print(f"Total in Queue: {stats.get('total', 0)}")
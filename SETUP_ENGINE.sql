@@ -61,6 +61,37 @@ CREATE POLICY "Anon can read crawl queue"
   TO anon
   USING (true);
 
+-- Atomically claim up to n pending URLs of a session
+-- FOR UPDATE SKIP LOCKED lets several workers claim at the same time
+-- without ever handing out the same row twice
+CREATE OR REPLACE FUNCTION claim_crawl_tasks(sess UUID, n INTEGER)
+RETURNS SETOF crawl_queue
+LANGUAGE sql
+AS $$
+  UPDATE crawl_queue
+  SET status = 'processing', processed_at = NOW()
+  WHERE id IN (
+    SELECT id FROM crawl_queue
+    WHERE session_id = sess AND status = 'pending'
+    ORDER BY depth ASC
+    LIMIT n
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING *;
+$$;
+
+-- Apply many task status updates in one statement
+-- (used by saas_worker.py instead of one PATCH per task)
+CREATE OR REPLACE FUNCTION crawl_queue_bulk_update(ids UUID[], statuses TEXT[], timestamps TIMESTAMPTZ[])
+RETURNS VOID
+LANGUAGE sql
+AS $$
+  UPDATE crawl_queue
+  SET status = data.status, completed_at = data.ts
+  FROM unnest(ids, statuses, timestamps) AS data(id, status, ts)
+  WHERE crawl_queue.id = data.id;
+$$;
+
 -- Verify table was created
 SELECT 'crawl_queue table created successfully!' AS status;
 SELECT COUNT(*) AS initial_rows FROM crawl_queue;
\ No newline at end of file
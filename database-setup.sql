@@ -140,6 +140,33 @@ CREATE INDEX IF NOT EXISTS idx_opportunities_project ON opportunities(project_id
 CREATE INDEX IF NOT EXISTS idx_opportunities_type ON opportunities(type);
 CREATE INDEX IF NOT EXISTS idx_opportunities_status ON opportunities(status);
 
+-- ============================================================
+-- QUEUE FUNCTIONS
+-- ============================================================
+
+-- Atomically claim up to n pending URLs for a worker.
+-- FOR UPDATE SKIP LOCKED lets several workers claim batches at the same
+-- time without ever handing out the same row twice.
+CREATE OR REPLACE FUNCTION claim_queue_batch(sid UUID DEFAULT NULL, n INTEGER DEFAULT 8)
+RETURNS SETOF crawl_queue
+LANGUAGE sql
+AS $$
+  UPDATE crawl_queue
+  SET status = 'processing', updated_at = NOW()
+  WHERE id IN (
+    SELECT q.id FROM crawl_queue q
+    JOIN crawl_sessions s ON s.id = q.session_id
+    WHERE q.status = 'pending'
+      AND (sid IS NULL OR q.session_id = sid)
+      -- Finished sessions (e.g. max_pages reached) hand out no more work
+      AND s.status NOT IN ('completed', 'failed')
+    ORDER BY q.priority DESC, q.created_at
+    LIMIT n
+    FOR UPDATE OF q SKIP LOCKED
+  )
+  RETURNING *;
+$$;
+
 -- ============================================================
 -- SUCCESS!
 -- ============================================================
@@ -4,7 +4,7 @@ Architecture: Database-driven polling system
 
 This worker:
 1. Polls crawl_queue table for pending URLs
-2. Crawls pages one-by-one and saves immediately
+2. Crawls pages concurrently and saves them in batches of PAGE_BATCH_SIZE
 3. Adds discovered URLs back to queue
 4. Runs indefinitely without timeout constraints
 5. Can be stopped/resumed anytime
@@ -13,28 +13,238 @@ Usage:
     python python_crawler_worker.py <supabase_url> <supabase_service_role_key>
 """
 
+import os
 import sys
+import gzip
+import base64
 import time
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import concurrent.futures
+import multiprocessing
+import aiohttp
+from selectolax.lexbor import LexborHTMLParser
 from urllib.parse import urljoin, urlparse
 import re
 from datetime import datetime
 from supabase import create_client, Client
 
+try:
+    # WHATWG URL parser (C++), much faster than urllib.parse
+    from ada_url import URL, join_url
+except ImportError:
+    URL = None
+    join_url = urljoin
+
 # Configuration
 POLL_INTERVAL = 2  # seconds between queue checks
-BATCH_SIZE = 1  # Process 1 URL at a time for immediate feedback
+CONCURRENCY = 8  # Number of pages fetched in parallel
+PAGE_BATCH_SIZE = 10  # Pages buffered before writing them in one batch
 REQUEST_TIMEOUT = 30  # seconds
 USER_AGENT = 'Mozilla/5.0 (compatible; InternalLinkAnalyzer/2.0; +https://example.com/bot)'
+SKIP_PREFIXES = ('#', 'javascript:', 'mailto:', 'tel:', 'data:', 'sms:')  # hrefs that are never links
+
+_WORD_RE = re.compile(r'\w+')
+_CATEGORY_RE = re.compile(r'/(?:category|tag|archive|blog)/')
+_PRODUCT_RE = re.compile(r'/(?:product|item|shop)/')
+
+
+def url_host(url: str) -> str:
+    """Host (including port) of an absolute URL"""
+    if URL is not None:
+        return URL(url).host
+    return urlparse(url).netloc
+
+
+def _in_content(node) -> bool:
+    """True if the node sits inside an <article> or <main> element"""
+    p = node.parent
+    while p is not None:
+        n = p.tag
+        if n == 'article' or n == 'main':
+            return True
+        if n == 'body':
+            return False
+        p = p.parent
+    return False
+
+
+def extract_seo_data(html: str, url: str, depth: int, status_code: int, response_time: int) -> dict:
+    """Extract SEO data from HTML (module-level so it can run in a worker process)"""
+    tree = LexborHTMLParser(html)
+    
+    # Title
+    title_tag = tree.css_first('title')
+    title = title_tag.text().strip() if title_tag else 'No Title'
+    
+    # Meta description
+    meta_desc = tree.css_first('meta[name="description"]')
+    meta_description = (meta_desc.attributes.get('content') or '').strip() if meta_desc else None
+    
+    # H1
+    h1_tag = tree.css_first('h1')
+    h1_text = h1_tag.text().strip() if h1_tag else None
+    has_h1 = h1_tag is not None
+    
+    # Word count is summed from headings and paragraphs below,
+    # instead of extracting the text of the whole page a second time
+    word_count = 0
+    
+    # Headers (single pass, position is document order across all levels)
+    headers = []
+    for idx, tag in enumerate(tree.css('h1,h2,h3,h4,h5,h6')):
+        text = tag.text().strip()
+        word_count += sum(1 for _ in _WORD_RE.finditer(text))
+        headers.append({
+            'level': int(tag.tag[1]),
+            'text': text[:500],
+            'position': idx
+        })
+    
+    # Paragraphs
+    paragraphs = []
+    for idx, p in enumerate(tree.css('p')):
+        text = p.text().strip()
+        p_words = sum(1 for _ in _WORD_RE.finditer(text))
+        word_count += p_words
+        if len(text) > 20:
+            paragraphs.append({
+                'text': text[:2000],
+                'word_count': p_words,
+                'position': idx
+            })
+    
+    # Links
+    links = []
+    internal_count = 0
+    external_count = 0
+    content_count = 0
+    source_netloc = url_host(url)
+    
+    for a in tree.css('a[href]'):
+        href = (a.attributes.get('href') or '').strip()
+        if not href or href.startswith(SKIP_PREFIXES):
+            continue
+        
+        try:
+            absolute_url = join_url(url, href)
+        except ValueError:
+            continue
+        anchor_text = a.text().strip()[:500]
+        is_nofollow = 'nofollow' in (a.attributes.get('rel') or '').split()
+        
+        # Check if internal (root-relative links never need parsing)
+        if href.startswith('/') and not href.startswith('//'):
+            is_internal = True
+        else:
+            is_internal = url_host(absolute_url) == source_netloc
+        
+        if is_internal:
+            internal_count += 1
+            # Simple heuristic: links in main content vs navigation
+            if _in_content(a):
+                content_count += 1
+                link_type = 'content'
+            else:
+                link_type = 'internal'
+        else:
+            external_count += 1
+            link_type = 'external'
+        
+        links.append({
+            'href': absolute_url,
+            'anchor_text': anchor_text,
+            'link_type': link_type,
+            'is_nofollow': is_nofollow,
+        })
+    
+    # Page type classification
+    path = urlparse(url).path.lower()
+    if path == '/' or path == '':
+        page_type = 'homepage'
+    elif _CATEGORY_RE.search(path):
+        page_type = 'category'
+    elif _PRODUCT_RE.search(path):
+        page_type = 'product'
+    elif word_count >= 300 and len(headers) >= 2:
+        page_type = 'content'
+    else:
+        page_type = 'other'
+    
+    # Health score
+    health_score = 100
+    if status_code != 200:
+        health_score -= 50
+    if not title or title == 'No Title':
+        health_score -= 15
+    if not meta_description:
+        health_score -= 10
+    if not has_h1:
+        health_score -= 15
+    if word_count < 300:
+        health_score -= 10
+    if internal_count == 0:
+        health_score -= 20
+    health_score = max(0, health_score)
+    
+    return {
+        'url': url,
+        'title': title,
+        'meta_description': meta_description,
+        'depth': depth,
+        'status': status_code,
+        'word_count': word_count,
+        'has_h1': has_h1,
+        'h1_text': h1_text,
+        'page_type': page_type,
+        'health_score': health_score,
+        'content_internal_links_count': content_count,
+        'external_links_count': external_count,
+        'internal_links_count': internal_count,
+        # Truncated, gzip + base64 to cut upload size (see FIX_PAGES_HTML_GZ.sql)
+        'html_gz': base64.b64encode(gzip.compress(html[:200000].encode('utf-8'), compresslevel=3)).decode('ascii'),
+        'content': ' '.join([p['text'] for p in paragraphs])[:50000],
+        'headers': headers,
+        'paragraphs': paragraphs[:30],
+        'links': links,
+    }
 
 
 class CrawlerWorker:
     def __init__(self, supabase_url: str, supabase_key: str):
         """Initialize the crawler worker"""
         self.supabase: Client = create_client(supabase_url, supabase_key)
+        self._page_batch = []  # (queue_id, session_id, project_id, max_pages, seo_data)
+        self._session_cache: dict[str, tuple] = {}  # session_id -> (project_id, max_pages, base_url)
+        self._parse_pool = None  # ProcessPoolExecutor for extract_seo_data, created in run()
+        self._claimed: set[str] = set()  # queue ids marked processing, not yet batched or failed
         print(f"✅ Connected to Supabase: {supabase_url}")
     
+    def _new_parse_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        """Process pool for extract_seo_data
+        
+        Workers are started via forkserver (spawn where unavailable): forking this
+        process after asyncio.to_thread has started threads can deadlock.
+        """
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=os.cpu_count(), mp_context=multiprocessing.get_context(method)
+        )
+    
+    async def parse_page(self, html: str, url: str, depth: int, status_code: int, response_time: int) -> dict:
+        """Run extract_seo_data in the process pool, replacing the pool if a worker process died"""
+        loop = asyncio.get_running_loop()
+        pool = self._parse_pool
+        try:
+            return await loop.run_in_executor(pool, extract_seo_data, html, url, depth, status_code, response_time)
+        except concurrent.futures.process.BrokenProcessPool:
+            # A crashed/OOM-killed parser breaks the pool for good; concurrent items
+            # see the same failure, so only the first one swaps in a new pool
+            if self._parse_pool is pool:
+                print("    ⚠️  Parser process died, restarting parse pool")
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._parse_pool = self._new_parse_pool()
+            return await loop.run_in_executor(self._parse_pool, extract_seo_data, html, url, depth, status_code, response_time)
+    
     def normalize_url(self, url: str) -> str:
         """Normalize URL for deduplication"""
         try:
@@ -50,32 +260,23 @@ class CrawlerWorker:
         except:
             return url.lower()
     
-    def get_next_queue_item(self):
-        """Get next pending URL from queue"""
-        result = self.supabase.table('crawl_queue') \
-            .select('*') \
-            .eq('status', 'pending') \
-            .order('priority', desc=True) \
-            .order('created_at', desc=False) \
-            .limit(1) \
-            .execute()
-        
-        if result.data and len(result.data) > 0:
-            return result.data[0]
-        return None
+    def claim_queue_batch(self, n: int = CONCURRENCY) -> list:
+        """Atomically claim up to n pending URLs (marks them processing)"""
+        result = self.supabase.rpc('claim_queue_batch', {'n': n}).execute()
+        return result.data or []
     
-    def mark_processing(self, queue_id: str):
-        """Mark queue item as processing"""
+    def mark_completed(self, queue_ids: list):
+        """Mark queue items as completed"""
         self.supabase.table('crawl_queue') \
-            .update({'status': 'processing', 'updated_at': datetime.utcnow().isoformat()}) \
-            .eq('id', queue_id) \
+            .update({'status': 'completed', 'updated_at': datetime.utcnow().isoformat()}) \
+            .in_('id', queue_ids) \
             .execute()
     
-    def mark_completed(self, queue_id: str):
-        """Mark queue item as completed"""
+    def release_claims(self, queue_ids: list):
+        """Put claimed but unprocessed queue items back to pending (on shutdown)"""
         self.supabase.table('crawl_queue') \
-            .update({'status': 'completed', 'updated_at': datetime.utcnow().isoformat()}) \
-            .eq('id', queue_id) \
+            .update({'status': 'pending', 'updated_at': datetime.utcnow().isoformat()}) \
+            .in_('id', queue_ids) \
             .execute()
     
     def mark_failed(self, queue_id: str, error_message: str):
@@ -89,156 +290,21 @@ class CrawlerWorker:
             .eq('id', queue_id) \
             .execute()
     
-    def fetch_page(self, url: str) -> tuple:
+    async def fetch_page(self, session: aiohttp.ClientSession, url: str) -> tuple:
         """Fetch a page and return (html, status_code, response_time)"""
         start_time = time.time()
         
-        headers = {
-            'User-Agent': USER_AGENT,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
-        
-        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        async with session.get(url, timeout=timeout, allow_redirects=True) as response:
+            html = await response.text(errors='replace')
+            status_code = response.status
         response_time = int((time.time() - start_time) * 1000)
         
-        return response.text, response.status_code, response_time
+        return html, status_code, response_time
     
-    def extract_seo_data(self, html: str, url: str, depth: int, status_code: int, response_time: int) -> dict:
-        """Extract SEO data from HTML"""
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        # Title
-        title_tag = soup.find('title')
-        title = title_tag.get_text().strip() if title_tag else 'No Title'
-        
-        # Meta description
-        meta_desc = soup.find('meta', {'name': 'description'})
-        meta_description = meta_desc.get('content', '').strip() if meta_desc else None
-        
-        # H1
-        h1_tag = soup.find('h1')
-        h1_text = h1_tag.get_text().strip() if h1_tag else None
-        has_h1 = h1_tag is not None
-        
-        # Word count
-        text_content = soup.get_text()
-        words = re.findall(r'\w+', text_content)
-        word_count = len(words)
-        
-        # Headers
-        headers = []
-        for i, level in enumerate([1, 2, 3, 4, 5, 6]):
-            for idx, tag in enumerate(soup.find_all(f'h{level}')):
-                headers.append({
-                    'level': level,
-                    'text': tag.get_text().strip()[:500],
-                    'position': idx
-                })
-        
-        # Paragraphs
-        paragraphs = []
-        for idx, p in enumerate(soup.find_all('p')):
-            text = p.get_text().strip()
-            if len(text) > 20:
-                p_words = re.findall(r'\w+', text)
-                paragraphs.append({
-                    'text': text[:2000],
-                    'word_count': len(p_words),
-                    'position': idx
-                })
-        
-        # Links
-        links = []
-        internal_count = 0
-        external_count = 0
-        content_count = 0
-        
-        for a in soup.find_all('a', href=True):
-            href = a.get('href', '').strip()
-            if not href or href.startswith('#') or href.startswith('javascript:') or href.startswith('mailto:'):
-                continue
-            
-            absolute_url = urljoin(url, href)
-            anchor_text = a.get_text().strip()[:500]
-            is_nofollow = 'nofollow' in a.get('rel', [])
-            
-            # Check if internal
-            is_internal = urlparse(absolute_url).netloc == urlparse(url).netloc
-            
-            if is_internal:
-                internal_count += 1
-                # Simple heuristic: links in main content vs navigation
-                parent_tags = [p.name for p in a.parents]
-                if 'article' in parent_tags or 'main' in parent_tags:
-                    content_count += 1
-                    link_type = 'content'
-                else:
-                    link_type = 'internal'
-            else:
-                external_count += 1
-                link_type = 'external'
-            
-            links.append({
-                'href': absolute_url,
-                'anchor_text': anchor_text,
-                'link_type': link_type,
-                'is_nofollow': is_nofollow,
-            })
-        
-        # Page type classification
-        path = urlparse(url).path.lower()
-        if path == '/' or path == '':
-            page_type = 'homepage'
-        elif any(x in path for x in ['/category/', '/tag/', '/archive/', '/blog/']):
-            page_type = 'category'
-        elif any(x in path for x in ['/product/', '/item/', '/shop/']):
-            page_type = 'product'
-        elif word_count >= 300 and len(headers) >= 2:
-            page_type = 'content'
-        else:
-            page_type = 'other'
-        
-        # Health score
-        health_score = 100
-        if status_code != 200:
-            health_score -= 50
-        if not title or title == 'No Title':
-            health_score -= 15
-        if not meta_description:
-            health_score -= 10
-        if not has_h1:
-            health_score -= 15
-        if word_count < 300:
-            health_score -= 10
-        if internal_count == 0:
-            health_score -= 20
-        health_score = max(0, health_score)
-        
-        return {
-            'url': url,
-            'title': title,
-            'meta_description': meta_description,
-            'depth': depth,
-            'status': status_code,
-            'word_count': word_count,
-            'has_h1': has_h1,
-            'h1_text': h1_text,
-            'page_type': page_type,
-            'health_score': health_score,
-            'content_internal_links_count': content_count,
-            'external_links_count': external_count,
-            'internal_links_count': internal_count,
-            'html': html[:100000],  # Truncate
-            'content': ' '.join([p['text'] for p in paragraphs])[:50000],
-            'headers': headers,
-            'paragraphs': paragraphs[:30],
-            'links': links,
-        }
-    
-    def save_page(self, session_id: str, project_id: str, seo_data: dict):
-        """Save page and related data to database"""
-        # 1. Save page
+    def flush_batch(self, batch: list) -> list:
+        """Save a batch of pages and related data with one insert per table"""
+        # 1. Save pages (ids are returned in insert order)
         page_result = self.supabase.table('pages').insert([{
             'project_id': project_id,
             'crawl_session_id': session_id,
@@ -248,45 +314,41 @@ class CrawlerWorker:
             'depth': seo_data['depth'],
             'status': seo_data['status'],
             'content': seo_data['content'],
-            'html': seo_data['html'],
+            'html_gz': seo_data['html_gz'],
             'word_count': seo_data['word_count'],
             'has_h1': seo_data['has_h1'],
             'content_internal_links_count': seo_data['content_internal_links_count'],
             'external_links_count': seo_data['external_links_count'],
             'page_type': seo_data['page_type'],
             'health_score': seo_data['health_score'],
-        }]).execute()
+        } for _, session_id, project_id, _, seo_data in batch]).execute()
         
-        if not page_result.data:
-            raise Exception("Failed to save page")
+        if not page_result.data or len(page_result.data) != len(batch):
+            raise Exception("Failed to save pages")
         
-        page_id = page_result.data[0]['id']
+        page_ids = [page['id'] for page in page_result.data]
         
-        # 2. Save headers
-        if seo_data['headers']:
-            header_records = [{
+        header_records = []
+        paragraph_records = []
+        link_records = []
+        for (_, _, project_id, _, seo_data), page_id in zip(batch, page_ids):
+            header_records.extend({
                 'page_id': page_id,
                 'project_id': project_id,
                 'level': h['level'],
                 'text': h['text'],
                 'position': h['position'],
-            } for h in seo_data['headers']]
-            self.supabase.table('page_headers').insert(header_records).execute()
-        
-        # 3. Save paragraphs
-        if seo_data['paragraphs']:
-            paragraph_records = [{
+            } for h in seo_data['headers'])
+            
+            paragraph_records.extend({
                 'page_id': page_id,
                 'project_id': project_id,
                 'text': p['text'],
                 'word_count': p['word_count'],
                 'position': p['position'],
-            } for p in seo_data['paragraphs']]
-            self.supabase.table('page_paragraphs').insert(paragraph_records).execute()
-        
-        # 4. Save links
-        if seo_data['links']:
-            link_records = [{
+            } for p in seo_data['paragraphs'])
+            
+            link_records.extend({
                 'page_id': page_id,
                 'project_id': project_id,
                 'source_url': seo_data['url'],
@@ -294,21 +356,67 @@ class CrawlerWorker:
                 'anchor_text': link['anchor_text'],
                 'link_type': link['link_type'],
                 'is_nofollow': link['is_nofollow'],
-            } for link in seo_data['links']]
+            } for link in seo_data['links'])
+        
+        # 2. Save headers
+        if header_records:
+            self.supabase.table('page_headers').insert(header_records).execute()
+        
+        # 3. Save paragraphs
+        if paragraph_records:
+            self.supabase.table('page_paragraphs').insert(paragraph_records).execute()
+        
+        # 4. Save links
+        if link_records:
             self.supabase.table('page_links').insert(link_records).execute()
         
-        return page_id
+        # 5. Mark queue items completed
+        self.mark_completed([queue_id for queue_id, _, _, _, _ in batch])
+        
+        return page_ids
+    
+    async def flush_pages(self):
+        """Write out buffered pages and refresh progress for their sessions"""
+        if not self._page_batch:
+            return
+        
+        batch, self._page_batch = self._page_batch, []
+        
+        try:
+            page_ids = await asyncio.to_thread(self.flush_batch, batch)
+        except Exception as e:
+            print(f"    ❌ Failed to save {len(batch)} pages: {str(e)}")
+            for queue_id, _, _, _, _ in batch:
+                await asyncio.to_thread(self.mark_failed, queue_id, str(e))
+            return
+        
+        print(f"    ✅ Saved {len(page_ids)} pages")
+        
+        sessions = {session_id: max_pages for _, session_id, _, max_pages, _ in batch}
+        for session_id, max_pages in sessions.items():
+            # The pages are already saved and completed, a failure here only delays progress
+            try:
+                # Update session progress
+                await asyncio.to_thread(self.update_session_progress, session_id)
+                
+                # Check if crawl is complete
+                if await asyncio.to_thread(self.check_if_complete, session_id, max_pages):
+                    print(f"✅ Crawl session {session_id} completed!")
+            except Exception as e:
+                print(f"    ⚠️  Failed to update session {session_id}: {str(e)}")
     
     def enqueue_new_urls(self, session_id: str, base_url: str, links: list, current_depth: int, max_pages: int):
-        """Add newly discovered URLs to the queue"""
-        # Get current queue + completed count
+        """Add newly discovered URLs to the queue (the DB skips known URLs)"""
+        # Once the queue holds max_pages distinct URLs there is enough to crawl
         queue_result = self.supabase.table('crawl_queue') \
-            .select('normalized_url', count='exact') \
+            .select('id', count='exact') \
             .eq('session_id', session_id) \
+            .limit(1) \
             .execute()
         
-        existing_urls = {item['normalized_url'] for item in queue_result.data}
-        total_in_queue = len(existing_urls)
+        total_in_queue = queue_result.count or 0
+        if total_in_queue >= max_pages:
+            return
         
         # Filter internal links only
         base_netloc = urlparse(base_url).netloc
@@ -317,12 +425,16 @@ class CrawlerWorker:
             if link['link_type'] in ['content', 'internal'] and urlparse(link['href']).netloc == base_netloc
         ]
         
-        # Add new URLs to queue
+        # Add new URLs to queue. No per-link budget: most links are usually already
+        # queued (nav comes first) and the DB drops those, so capping here would
+        # starve the crawl. max_pages is enforced at claim time instead: once
+        # check_if_complete marks the session completed, claim_queue_batch skips it.
+        seen = set()
         new_urls = []
         for link in internal_links:
             normalized = self.normalize_url(link['href'])
-            if normalized not in existing_urls and len(new_urls) + total_in_queue < max_pages:
-                existing_urls.add(normalized)
+            if normalized not in seen:
+                seen.add(normalized)
                 new_urls.append({
                     'session_id': session_id,
                     'url': link['href'],
@@ -333,8 +445,11 @@ class CrawlerWorker:
                 })
         
         if new_urls:
-            self.supabase.table('crawl_queue').insert(new_urls).execute()
-            print(f"    ➕ Added {len(new_urls)} new URLs to queue")
+            # unique_session_url (session_id, normalized_url) drops duplicates
+            self.supabase.table('crawl_queue') \
+                .upsert(new_urls, on_conflict='session_id,normalized_url', ignore_duplicates=True) \
+                .execute()
+            print(f"    ➕ Sent {len(new_urls)} URLs to queue")
     
     def update_session_progress(self, session_id: str):
         """Update session statistics"""
@@ -357,11 +472,11 @@ class CrawlerWorker:
     
     def check_if_complete(self, session_id: str, max_pages: int) -> bool:
         """Check if crawl is complete"""
-        # Count pending items
+        # Count unfinished items - 'processing' ones may still enqueue links
         pending_result = self.supabase.table('crawl_queue') \
             .select('id', count='exact') \
             .eq('session_id', session_id) \
-            .eq('status', 'pending') \
+            .in_('status', ['pending', 'processing']) \
             .execute()
         
         pending_count = pending_result.count or 0
@@ -374,7 +489,7 @@ class CrawlerWorker:
         
         pages_crawled = pages_result.count or 0
         
-        # Complete if no pending items OR reached max pages
+        # Complete if no unfinished items OR reached max pages
         if pending_count == 0 or pages_crawled >= max_pages:
             self.supabase.table('crawl_sessions') \
                 .update({
@@ -388,8 +503,35 @@ class CrawlerWorker:
         
         return False
     
-    def process_queue_item(self, queue_item: dict):
-        """Process a single queue item"""
+    def _load_session(self, session_id: str) -> tuple:
+        """Load and cache (project_id, max_pages, base_url) for a session"""
+        session_result = self.supabase.table('crawl_sessions') \
+            .select('*') \
+            .eq('id', session_id) \
+            .single() \
+            .execute()
+        
+        if not session_result.data:
+            raise Exception(f"Session {session_id} not found")
+        
+        session = session_result.data
+        project_id = session['project_id']
+        max_pages = session.get('max_pages', 1000)
+        
+        # Get base URL from project
+        project_result = self.supabase.table('projects') \
+            .select('base_url') \
+            .eq('id', project_id) \
+            .single() \
+            .execute()
+        
+        base_url = project_result.data['base_url']
+        
+        self._session_cache[session_id] = (project_id, max_pages, base_url)
+        return self._session_cache[session_id]
+    
+    async def process_queue_item(self, session: aiohttp.ClientSession, queue_item: dict):
+        """Process a single queue item (already marked as processing)"""
         queue_id = queue_item['id']
         url = queue_item['url']
         session_id = queue_item['session_id']
@@ -398,84 +540,96 @@ class CrawlerWorker:
         print(f"  🌐 Crawling: {url}")
         
         try:
-            # Mark as processing
-            self.mark_processing(queue_id)
-            
-            # Get session info
-            session_result = self.supabase.table('crawl_sessions') \
-                .select('*') \
-                .eq('id', session_id) \
-                .single() \
-                .execute()
-            
-            if not session_result.data:
-                raise Exception(f"Session {session_id} not found")
-            
-            session = session_result.data
-            project_id = session['project_id']
-            max_pages = session.get('max_pages', 1000)
-            
-            # Get base URL from project
-            project_result = self.supabase.table('projects') \
-                .select('base_url') \
-                .eq('id', project_id) \
-                .single() \
-                .execute()
-            
-            base_url = project_result.data['base_url']
+            # Get session info (constant per session, cached)
+            project_id, max_pages, base_url = self._session_cache.get(session_id) \
+                or await asyncio.to_thread(self._load_session, session_id)
             
             # Fetch page
-            html, status_code, response_time = self.fetch_page(url)
+            html, status_code, response_time = await self.fetch_page(session, url)
             print(f"    📡 {status_code} ({response_time}ms)")
             
-            # Extract SEO data
-            seo_data = self.extract_seo_data(html, url, depth, status_code, response_time)
-            
-            # Save page (IMMEDIATELY - streams to database)
-            page_id = self.save_page(session_id, project_id, seo_data)
-            print(f"    ✅ Saved page {page_id}")
+            # Extract SEO data (CPU-bound, runs in a separate process)
+            seo_data = await self.parse_page(html, url, depth, status_code, response_time)
             
             # Enqueue new URLs
-            self.enqueue_new_urls(session_id, base_url, seo_data['links'], depth, max_pages)
-            
-            # Mark completed
-            self.mark_completed(queue_id)
+            await asyncio.to_thread(self.enqueue_new_urls, session_id, base_url, seo_data['links'], depth, max_pages)
             
-            # Update session progress
-            self.update_session_progress(session_id)
-            
-            # Check if crawl is complete
-            if self.check_if_complete(session_id, max_pages):
-                print(f"✅ Crawl session {session_id} completed!")
+            # Buffer the page, it is saved and marked completed with its batch
+            self._page_batch.append((queue_id, session_id, project_id, max_pages, seo_data))
+            self._claimed.discard(queue_id)
             
         except Exception as e:
             print(f"    ❌ Failed: {str(e)}")
-            self.mark_failed(queue_id, str(e))
+            await asyncio.to_thread(self.mark_failed, queue_id, str(e))
+            self._claimed.discard(queue_id)
+        
+        # Outside the try: a batch write error must not mark this buffered item failed
+        if len(self._page_batch) >= PAGE_BATCH_SIZE:
+            await self.flush_pages()
     
-    def run(self):
+    async def process_queue(self, session: aiohttp.ClientSession, queue: asyncio.Queue):
+        """Consume queue items fed by run()"""
+        while True:
+            queue_item = await queue.get()
+            try:
+                await self.process_queue_item(session, queue_item)
+            except Exception as e:
+                # e.g. mark_failed while Supabase is unreachable - keep this consumer alive
+                print(f"❌ Worker error: {str(e)}")
+            finally:
+                queue.task_done()
+    
+    async def run(self):
         """Main worker loop"""
         print("🚀 Crawler Worker started")
         print(f"⏱️  Polling every {POLL_INTERVAL}s")
+        print(f"⚡ Fetching {CONCURRENCY} pages concurrently")
         print("Press Ctrl+C to stop\n")
         
-        while True:
+        queue = asyncio.Queue(maxsize=CONCURRENCY)
+        self._parse_pool = self._new_parse_pool()
+        
+        # One keep-alive session for all fetches so TLS connections are reused
+        connector = aiohttp.TCPConnector(limit=32, limit_per_host=8, keepalive_timeout=60)
+        headers = {
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+        }
+        async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+            workers = [asyncio.create_task(self.process_queue(session, queue)) for _ in range(CONCURRENCY)]
+            
             try:
-                # Get next queue item
-                queue_item = self.get_next_queue_item()
+                while True:
+                    try:
+                        # Claim a batch of queue items and hand them to the workers
+                        queue_items = await asyncio.to_thread(self.claim_queue_batch)
+                        
+                        if queue_items:
+                            self._claimed.update(queue_item['id'] for queue_item in queue_items)
+                            for queue_item in queue_items:
+                                await queue.put(queue_item)
+                        else:
+                            # No items in queue, save what we have and wait
+                            await self.flush_pages()
+                            print("⏸️  Queue empty, waiting...")
+                            await asyncio.sleep(POLL_INTERVAL)
+                            
+                    except Exception as e:
+                        print(f"❌ Worker error: {str(e)}")
+                        await asyncio.sleep(POLL_INTERVAL)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                await self.flush_pages()
                 
-                if queue_item:
-                    self.process_queue_item(queue_item)
-                else:
-                    # No items in queue, wait
-                    print("⏸️  Queue empty, waiting...")
-                    time.sleep(POLL_INTERVAL)
-                    
-            except KeyboardInterrupt:
-                print("\n⏹️  Worker stopped by user")
-                break
-            except Exception as e:
-                print(f"❌ Worker error: {str(e)}")
-                time.sleep(POLL_INTERVAL)
+                # Items still queued locally or cancelled mid-fetch would otherwise stay
+                # 'processing' forever - claim_queue_batch only picks up 'pending'
+                if self._claimed:
+                    await asyncio.to_thread(self.release_claims, list(self._claimed))
+                    print(f"↩️  Released {len(self._claimed)} unprocessed URLs back to the queue")
+                self._parse_pool.shutdown(cancel_futures=True)
 
 
 if __name__ == '__main__':
@@ -487,4 +641,7 @@ if __name__ == '__main__':
     supabase_key = sys.argv[2]
     
     worker = CrawlerWorker(supabase_url, supabase_key)
-    worker.run()
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        print("\n⏹️  Worker stopped by user")
@@ -1,19 +1,91 @@
 """
 Industrial-Grade SaaS Crawler Worker
-Uses concurrent pipelines with semaphore control for Screaming Frog-level performance
+Uses queue-connected fetch and save stages for Screaming Frog-level performance
 """
 import asyncio
+import hashlib
+import math
 import os
 import httpx
 import sys
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse, urljoin
+import time
+from collections import defaultdict
+import lxml.html
+from lxml import etree
+from urllib.parse import urlparse, urljoin, urlsplit
 from datetime import datetime
 
 # CONFIG
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-CONCURRENCY_LIMIT = 20  # Screaming Frog speed - adjust based on your needs
+CONCURRENCY_LIMIT = 50  # fetcher coroutines (network-bound) - adjust based on your needs
+SAVER_COUNT = 4  # saver coroutines (Supabase-bound)
+FETCH_QUEUE_SIZE = 100  # claimed tasks waiting for a fetcher
+SAVE_QUEUE_SIZE = 500  # parsed pages waiting for a saver
+CLAIM_BATCH_SIZE = 25  # max tasks claimed per claim_crawl_tasks call
+PER_HOST_LIMIT = 6  # simultaneous fetches against any single host
+KEEPALIVE_EXPIRY = 60.0  # seconds an idle pooled connection stays open
+HTTP_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+MAX_HTML_BYTES = 2_000_000  # bodies larger than this are not worth parsing
+PAGE_CONTENT_CHARS = 10_000  # text kept in pages.content (read as plain text by compare-content)
+LINK_FLUSH_INTERVAL = 0.5  # seconds between batched crawl_queue inserts
+LINK_FLUSH_SIZE = 1000  # flush early once this many links are pending
+STATUS_FLUSH_INTERVAL = 0.25  # seconds between batched task status updates
+STATUS_FLUSH_SIZE = 200  # flush early once this many status updates are pending
+PROGRESS_EVERY_PAGES = 10  # push session progress every N pages...
+PROGRESS_EVERY_SECONDS = 2.0  # ...or when the last push is older than this
+_SKIP_EXTS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.css', '.js',
+              '.xml', '.ico', '.woff', '.woff2', '.mp4', '.zip')  # non-HTML resources
+_SKIP_HREF_PREFIXES = ('mailto:', 'tel:', 'javascript:', '#')  # hrefs that never lead to a page
+_HREF_XPATH = etree.XPath('//a/@href', smart_strings=False)  # plain strs, no back-reference to the tree
+_HTML_PARSERS = {}  # charset -> lxml HTMLParser, see html_parser()
+
+def html_parser(encoding):
+    """lxml HTML parser for the charset declared in Content-Type (None: detect from the document)"""
+    if encoding not in _HTML_PARSERS:
+        try:
+            _HTML_PARSERS[encoding] = lxml.html.HTMLParser(encoding=encoding) if encoding else None
+        except LookupError:  # unknown charset name, let lxml detect it
+            _HTML_PARSERS[encoding] = None
+    return _HTML_PARSERS[encoding]
+
+def resolve_href(base, base_url, href):
+    """Resolve an <a href> against a page URL already split once with urlsplit.
+    
+    Returns (absolute_url, split_parts), or None for non-navigational hrefs.
+    Absolute and root-relative hrefs skip the (pure Python) urljoin.
+    """
+    href = href.strip()
+    if not href or href.startswith(_SKIP_HREF_PREFIXES):
+        return None
+    if href.startswith(('http://', 'https://')):
+        url = href
+    elif href.startswith('/') and not href.startswith('//'):
+        url = f"{base.scheme}://{base.netloc}{href}"
+    else:
+        url = urljoin(base_url, href)
+    return url, urlsplit(url)
+
+class BloomFilter:
+    """Fixed-size Bloom filter for strings (false positives possible, no false negatives)"""
+    def __init__(self, capacity: int, error_rate: float):
+        self.num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from the two halves of one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item: str):
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
 
 class SaaSWorker:
     def __init__(self, session_id: str, project_id: str):
@@ -25,116 +97,164 @@ class SaaSWorker:
             "Content-Type": "application/json",
             "Prefer": "return=representation"
         }
-        self.semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
+        self.fetch_q = None  # claimed tasks -> fetchers (created in run)
+        self.save_q = None  # (task, tree, hrefs) -> savers (created in run)
+        self._in_flight = 0  # claimed tasks whose final status is not recorded yet
+        self._host_sems: dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(PER_HOST_LIMIT))
+        self.fetch_client = None  # outbound page fetches; Supabase calls use their own pool
         self.pages_crawled = 0
         self.max_pages = None
+        self._seen = BloomFilter(capacity=200_000, error_rate=0.001)  # URLs already sent to crawl_queue
+        self._pending_links = []  # crawl_queue rows waiting for the next batched insert
+        self._pending_statuses = []  # (task_id, status, completed_at) waiting for the next bulk update
+        self._last_progress_push = time.monotonic()
         
-    async def fetch_task(self, client):
-        """Atomic: Grab a URL and lock it to this worker"""
+    async def claim_tasks(self, client, n=5):
+        """Atomic: Grab up to n URLs and lock them to this worker
+        
+        Returns [] when the queue is empty and None when the claim itself failed
+        (e.g. claim_crawl_tasks missing - see FIX_CRAWL_QUEUE_RPCS.sql).
+        """
         try:
-            # Atomic fetch-and-update using PostgREST
-            url = f"{SUPABASE_URL}/rest/v1/crawl_queue?session_id=eq.{self.session_id}&status=eq.pending&order=depth.asc&limit=1"
-            res = await client.get(url, headers=self.headers)
-            tasks = res.json()
-            
-            if not tasks:
-                return None
-            
-            task = tasks[0]
-            
-            # Lock this task atomically
-            patch_url = f"{SUPABASE_URL}/rest/v1/crawl_queue?id=eq.{task['id']}"
-            await client.patch(
-                patch_url,
-                json={"status": "processing", "processed_at": datetime.utcnow().isoformat()},
+            # UPDATE ... FOR UPDATE SKIP LOCKED RETURNING * (see SETUP_ENGINE.sql)
+            res = await client.post(
+                f"{SUPABASE_URL}/rest/v1/rpc/claim_crawl_tasks",
+                json={"sess": self.session_id, "n": n},
                 headers=self.headers
             )
-            
-            return task
+            if res.status_code != 200:
+                print(f"❌ Error fetching task: {res.text}")
+                return None
+            return res.json()
         except Exception as e:
             print(f"❌ Error fetching task: {e}")
             return None
 
-    async def crawl_url(self, client, task):
-        """Pipeline: Fetch → Parse → Save → Enqueue (all concurrent)"""
-        async with self.semaphore:  # Limits simultaneous requests
+    async def fetcher(self, client):
+        """Pipeline stage 1: Fetch → Parse, then hand the page to the savers"""
+        while True:
+            task = await self.fetch_q.get()
             try:
                 print(f"🚀 [{self.pages_crawled}/{self.max_pages or '?'}] Crawling: {task['url']} (depth: {task['depth']})")
                 
-                # Fetch with timeout
-                resp = await client.get(
-                    task['url'],
-                    timeout=15.0,
-                    follow_redirects=True,
-                    headers={"User-Agent": "InternalLinkBot/1.0 (SaaS Crawler)"}
-                )
+                # Fetch with timeout, politely capped per host
+                async with self._host_sems[urlparse(task['url']).netloc]:
+                    status_code, body, encoding = await self.fetch_html(task['url'])
                 
-                if resp.status_code == 200:
-                    soup = BeautifulSoup(resp.text, 'html.parser')
-                    
-                    # Pipeline Step 1: Save page data (non-blocking)
-                    save_task = asyncio.create_task(self.save_page_data(client, task, soup, resp.status_code))
-                    
-                    # Pipeline Step 2: Extract and enqueue links (concurrent with save)
-                    if task['depth'] < 20:  # Max depth
-                        enqueue_task = asyncio.create_task(self.enqueue_new_links(client, task, soup))
-                    else:
-                        enqueue_task = None
-                    
-                    # Wait for both to complete
-                    await save_task
-                    if enqueue_task:
-                        await enqueue_task
-                    
-                    status = "completed"
-                    self.pages_crawled += 1
-                    
-                    # Update progress every page
-                    await self.update_session_progress(client)
-                    
+                if status_code == 200 and body is None:
+                    print(f"⏭️  Not HTML or too large: {task['url']}")
+                    await self.record_status(client, task, "completed")  # same as worker.py: nothing to parse
+                elif status_code == 200 and not body.strip():
+                    # lxml raises "Document is empty" on these
+                    print(f"⏭️  Empty page: {task['url']}")
+                    await self.record_status(client, task, "completed")
+                elif status_code == 200:
+                    tree = lxml.html.fromstring(body, parser=html_parser(encoding))
+                    # Read anchors once, before save_page_data strips nav/header/footer
+                    hrefs = _HREF_XPATH(tree)
+                    await self.save_q.put((task, tree, hrefs))
                 else:
-                    print(f"⚠️  Status {resp.status_code}: {task['url']}")
-                    status = "failed"
+                    print(f"⚠️  Status {status_code}: {task['url']}")
+                    await self.record_status(client, task, "failed")
                     
             except asyncio.TimeoutError:
                 print(f"⏱️  Timeout: {task['url']}")
-                status = "failed"
+                await self.record_status(client, task, "failed")
             except Exception as e:
                 print(f"❌ Error on {task['url']}: {e}")
-                status = "failed"
-            
-            # Mark task as complete
+                await self.record_status(client, task, "failed")
+            finally:
+                self.fetch_q.task_done()
+
+    async def saver(self, client):
+        """Pipeline stage 2: Save → Enqueue (concurrent), off the fetchers' critical path"""
+        while True:
+            task, tree, hrefs = await self.save_q.get()
             try:
-                await client.patch(
-                    f"{SUPABASE_URL}/rest/v1/crawl_queue?id=eq.{task['id']}",
-                    json={"status": status, "completed_at": datetime.utcnow().isoformat()},
-                    headers=self.headers
-                )
+                # Save page data and extract/enqueue links concurrently
+                save_task = asyncio.create_task(self.save_page_data(client, task, tree, hrefs, 200))
+                if task['depth'] < 20:  # Max depth
+                    enqueue_task = asyncio.create_task(self.enqueue_new_links(client, task, hrefs))
+                else:
+                    enqueue_task = None
+                
+                # Wait for both to complete
+                await save_task
+                if enqueue_task:
+                    await enqueue_task
+                
+                self.pages_crawled += 1
+                await self.record_status(client, task, "completed")
+                
+                # Coalesce progress updates
+                if (self.pages_crawled % PROGRESS_EVERY_PAGES == 0
+                        or time.monotonic() - self._last_progress_push > PROGRESS_EVERY_SECONDS):
+                    await self.update_session_progress(client)
+                    
             except Exception as e:
-                print(f"❌ Error updating task status: {e}")
+                print(f"❌ Error saving {task['url']}: {e}")
+                await self.record_status(client, task, "failed")
+            finally:
+                self.save_q.task_done()
+
+    async def record_status(self, client, task, status):
+        """Mark a claimed task finished (written in bulk by flush_statuses)"""
+        self._in_flight -= 1
+        self._pending_statuses.append((task['id'], status, datetime.utcnow().isoformat()))
+        if len(self._pending_statuses) >= STATUS_FLUSH_SIZE:
+            await self.flush_statuses(client)
 
-    async def save_page_data(self, client, task, soup, status_code):
+    async def fetch_html(self, url):
+        """Stream a page, returning (status_code, body, charset) - body is None unless it is HTML under MAX_HTML_BYTES"""
+        async with self.fetch_client.stream(
+            'GET',
+            url,
+            follow_redirects=True,
+            headers={"User-Agent": "InternalLinkBot/1.0 (SaaS Crawler)"}
+        ) as resp:
+            if resp.status_code != 200:
+                return resp.status_code, None, None
+            
+            # Bail before downloading images, PDFs and huge documents
+            if not resp.headers.get('content-type', '').startswith('text/html'):
+                return resp.status_code, None, None
+            if int(resp.headers.get('content-length') or 0) >= MAX_HTML_BYTES:
+                return resp.status_code, None, None
+            
+            # Content-Length can be missing or wrong, so cap while reading too
+            chunks = []
+            size = 0
+            async for chunk in resp.aiter_bytes(65536):
+                size += len(chunk)
+                if size >= MAX_HTML_BYTES:
+                    return resp.status_code, None, None
+                chunks.append(chunk)
+            
+            # lxml only sees the bytes, so pass on the Content-Type charset; without one
+            # it falls back to <meta charset> / its own detection
+            return resp.status_code, b''.join(chunks), resp.charset_encoding
+
+    async def save_page_data(self, client, task, tree, hrefs, status_code):
         """Save page to database"""
         try:
             # Extract page data
-            title = (soup.title.string if soup.title else "No Title").strip()[:500]
-            meta_desc = None
-            meta_tag = soup.find('meta', attrs={'name': 'description'})
-            if meta_tag and meta_tag.get('content'):
-                meta_desc = meta_tag['content'][:1000]
+            title = tree.findtext('.//title')
+            title = (title if title is not None else "No Title").strip()[:500]
+            meta_desc = tree.xpath('string(//meta[@name="description"]/@content)')[:1000] or None
             
-            # Extract text content (clean)
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
-            text = soup.get_text(separator=' ', strip=True)[:10000]
+            # Extract text content (clean) - one C-level pass instead of decompose()
+            etree.strip_elements(tree, etree.Comment, 'script', 'style', 'nav', 'footer', 'header', with_tail=False)
+            # split()/join collapse all whitespace in C; joining text nodes with ' ' first keeps
+            # words from adjacent tags apart (text_content() would glue "<p>a</p><p>b</p>" into "ab")
+            text = ' '.join(' '.join(tree.itertext()).split())[:PAGE_CONTENT_CHARS]
             
             # Count internal links
-            domain = urlparse(task['url']).netloc
+            base = urlsplit(task['url'])
             internal_links = []
-            for a in soup.find_all('a', href=True):
-                href = urljoin(task['url'], a['href'])
-                if urlparse(href).netloc == domain:
-                    internal_links.append(href)
+            for raw_href in hrefs:
+                resolved = resolve_href(base, task['url'], raw_href)
+                if resolved and resolved[1].netloc == base.netloc:
+                    internal_links.append(resolved[0])
             
             # Upsert to pages table
             page_data = {
@@ -164,19 +284,23 @@ class SaaSWorker:
         except Exception as e:
             print(f"  ❌ Error saving page data: {e}")
 
-    async def enqueue_new_links(self, client, task, soup):
+    async def enqueue_new_links(self, client, task, hrefs):
         """Extract links and add to queue (with automatic deduplication)"""
         try:
-            domain = urlparse(task['url']).netloc
+            base = urlsplit(task['url'])
+            domain = base.netloc
+            depth = task['depth'] + 1
             links_to_add = []
             
-            for a in soup.find_all('a', href=True):
+            for raw_href in hrefs:
                 try:
                     # Resolve to absolute URL
-                    href = urljoin(task['url'], a['href'])
+                    resolved = resolve_href(base, task['url'], raw_href)
+                    if resolved is None:
+                        continue
+                    href, parsed = resolved
                     
                     # Normalize URL (remove fragments, trailing slash)
-                    parsed = urlparse(href)
                     if parsed.netloc != domain:
                         continue  # Skip external links
                     
@@ -186,14 +310,20 @@ class SaaSWorker:
                         normalized += f"?{parsed.query}"
                     
                     # Skip non-HTML resources
-                    if any(normalized.endswith(ext) for ext in ['.pdf', '.jpg', '.png', '.gif', '.css', '.js', '.xml']):
+                    if normalized.endswith(_SKIP_EXTS):
+                        continue
+                    
+                    # Skip URLs this worker already queued (within the page and across pages),
+                    # saving the DB round-trip; a rare false positive just drops one link
+                    if normalized in self._seen:
                         continue
+                    self._seen.add(normalized)
                     
                     links_to_add.append({
                         "session_id": self.session_id,
                         "url": href,
                         "normalized_url": normalized,
-                        "depth": task['depth'] + 1,
+                        "depth": depth,
                         "status": "pending"
                     })
                     
@@ -202,20 +332,89 @@ class SaaSWorker:
                     pass
             
             if links_to_add:
-                # Database handles deduplication via UNIQUE constraint
-                headers_ignore = {**self.headers, "Prefer": "resolution=ignore-duplicates"}
-                await client.post(
-                    f"{SUPABASE_URL}/rest/v1/crawl_queue",
-                    json=links_to_add,
-                    headers=headers_ignore
-                )
-                print(f"  📥 Enqueued {len(links_to_add)} links (depth {task['depth'] + 1})")
+                # Inserted in batches by flush_links
+                self._pending_links.extend(links_to_add)
+                if len(self._pending_links) >= LINK_FLUSH_SIZE:
+                    await self.flush_links(client)
                 
         except Exception as e:
             print(f"  ❌ Error enqueuing links: {e}")
 
+    async def flush_links(self, client):
+        """Insert all pending links into the queue in one request"""
+        if not self._pending_links:
+            return
+        
+        batch, self._pending_links = self._pending_links, []
+        
+        # Drop duplicates within the batch (first occurrence wins, it has the lowest depth)
+        unique_links = {}
+        for link in batch:
+            unique_links.setdefault(link['normalized_url'], link)
+        
+        rows = list(unique_links.values())
+        try:
+            # Database handles deduplication via the unique_session_url constraint
+            # (on_conflict must name it, otherwise only conflicts on id are ignored)
+            headers_ignore = {**self.headers, "Prefer": "resolution=ignore-duplicates"}
+            res = await client.post(
+                f"{SUPABASE_URL}/rest/v1/crawl_queue?on_conflict=session_id,normalized_url",
+                json=rows,
+                headers=headers_ignore
+            )
+        except asyncio.CancelledError:
+            self._pending_links[:0] = rows  # retried by the final flush
+            raise
+        except Exception as e:
+            # Transport error: these URLs are already in self._seen, so retry the batch
+            print(f"  ❌ Error enqueuing links: {e}")
+            self._pending_links[:0] = rows
+            return
+        
+        if res.status_code >= 500:
+            print(f"  ❌ Error enqueuing links: HTTP {res.status_code}: {res.text}")
+            self._pending_links[:0] = rows
+        elif not res.is_success:
+            # A 4xx would fail the same way on every retry - drop the batch
+            print(f"  ❌ Dropped {len(rows)} links: HTTP {res.status_code}: {res.text}")
+        else:
+            print(f"  📥 Enqueued {len(rows)} links")
+
+    async def flush_statuses(self, client):
+        """Apply all pending task status updates with one crawl_queue_bulk_update call"""
+        if not self._pending_statuses:
+            return
+        
+        batch, self._pending_statuses = self._pending_statuses, []
+        ids, statuses, timestamps = (list(column) for column in zip(*batch))
+        
+        try:
+            res = await client.post(
+                f"{SUPABASE_URL}/rest/v1/rpc/crawl_queue_bulk_update",
+                json={"ids": ids, "statuses": statuses, "timestamps": timestamps},
+                headers=self.headers
+            )
+            if not res.is_success:
+                raise RuntimeError(f"HTTP {res.status_code}: {res.text}")
+        except asyncio.CancelledError:
+            self._pending_statuses[:0] = batch  # retried by the final flush
+            raise
+        except Exception as e:
+            # Put the batch back, otherwise these tasks stay 'processing' forever
+            print(f"❌ Error updating task status: {e}")
+            self._pending_statuses[:0] = batch
+
+    async def flush_periodically(self, client, flush, interval, stop):
+        """Background task: call flush(client) every interval seconds until stop is set"""
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                await flush(client)
+
     async def update_session_progress(self, client):
         """Update crawl session progress"""
+        self._last_progress_push = time.monotonic()
         try:
             await client.patch(
                 f"{SUPABASE_URL}/rest/v1/crawl_sessions?id=eq.{self.session_id}",
@@ -250,53 +449,103 @@ class SaaSWorker:
         print(f"   Concurrency: {CONCURRENCY_LIMIT}")
         print(f"   Supabase: {SUPABASE_URL}")
         
+        # Long-lived HTTP/2 pools: connections (and TLS sessions) are reused across pages,
+        # and all PostgREST calls multiplex over a handful of Supabase connections
         async with httpx.AsyncClient(
-            limits=httpx.Limits(max_connections=CONCURRENCY_LIMIT, max_keepalive_connections=10)
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=KEEPALIVE_EXPIRY),
+            timeout=HTTP_TIMEOUT
+        ) as fetch_client, httpx.AsyncClient(
+            base_url=SUPABASE_URL,
+            http2=True,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=50, keepalive_expiry=KEEPALIVE_EXPIRY),
+            timeout=HTTP_TIMEOUT
         ) as client:
+            self.fetch_client = fetch_client
+            self.fetch_q = asyncio.Queue(maxsize=FETCH_QUEUE_SIZE)
+            self.save_q = asyncio.Queue(maxsize=SAVE_QUEUE_SIZE)
+            stages = [asyncio.create_task(self.fetcher(client)) for _ in range(CONCURRENCY_LIMIT)]
+            stages += [asyncio.create_task(self.saver(client)) for _ in range(SAVER_COUNT)]
+            stop_flushing = asyncio.Event()
+            flushers = [
+                asyncio.create_task(self.flush_periodically(client, self.flush_links, LINK_FLUSH_INTERVAL, stop_flushing)),
+                asyncio.create_task(self.flush_periodically(client, self.flush_statuses, STATUS_FLUSH_INTERVAL, stop_flushing)),
+            ]
             
-            empty_queue_count = 0
-            
-            while True:
-                # Check if we should stop
-                if not await self.check_session_status(client):
-                    print("🛑 Session stopped or completed")
-                    break
-                
-                # Check page limit
-                if self.max_pages and self.pages_crawled >= self.max_pages:
-                    print(f"✅ Reached page limit: {self.max_pages}")
-                    await client.patch(
-                        f"{SUPABASE_URL}/rest/v1/crawl_sessions?id=eq.{self.session_id}",
-                        json={"status": "completed", "completed_at": datetime.utcnow().isoformat()},
-                        headers=self.headers
-                    )
-                    break
-                
-                # Fetch batch of tasks (feed the pipeline)
-                tasks = []
-                for _ in range(5):  # Small batch to keep pipeline full
-                    task = await self.fetch_task(client)
-                    if task:
-                        tasks.append(task)
+            try:
+                empty_queue_count = 0
                 
-                if not tasks:
-                    empty_queue_count += 1
-                    if empty_queue_count > 6:  # 30 seconds of empty queue
-                        print("✅ Queue empty for 30s - crawl complete!")
+                while True:
+                    # Check if we should stop
+                    if not await self.check_session_status(client):
+                        print("🛑 Session stopped or completed")
+                        break
+                    
+                    # Check page limit
+                    if self.max_pages and self.pages_crawled >= self.max_pages:
+                        print(f"✅ Reached page limit: {self.max_pages}")
                         await client.patch(
                             f"{SUPABASE_URL}/rest/v1/crawl_sessions?id=eq.{self.session_id}",
                             json={"status": "completed", "completed_at": datetime.utcnow().isoformat()},
                             headers=self.headers
                         )
                         break
-                    print(f"📭 Queue empty... checking again in 5s (attempt {empty_queue_count}/6)")
-                    await asyncio.sleep(5)
-                    continue
-                
-                empty_queue_count = 0  # Reset counter
+                    
+                    # Make links found so far claimable
+                    await self.flush_links(client)
+                    
+                    # Claim only what the fetch queue (and page limit) has room for
+                    n = min(CLAIM_BATCH_SIZE, FETCH_QUEUE_SIZE - self.fetch_q.qsize())
+                    if self.max_pages:
+                        n = min(n, self.max_pages - self.pages_crawled - self._in_flight)
+                    if n <= 0:
+                        await asyncio.sleep(0.5)
+                        continue
+                    
+                    # Feed the pipeline
+                    tasks = await self.claim_tasks(client, n=n)
+                    
+                    if tasks is None:
+                        # A failed claim says nothing about the queue - never finish the session on it
+                        await asyncio.sleep(5)
+                        continue
+                    
+                    if not tasks:
+                        if self._in_flight:
+                            # Pages still in the pipeline may discover more links
+                            await asyncio.sleep(0.5)
+                            continue
+                        empty_queue_count += 1
+                        if empty_queue_count > 6:  # 30 seconds of empty queue
+                            print("✅ Queue empty for 30s - crawl complete!")
+                            await client.patch(
+                                f"{SUPABASE_URL}/rest/v1/crawl_sessions?id=eq.{self.session_id}",
+                                json={"status": "completed", "completed_at": datetime.utcnow().isoformat()},
+                                headers=self.headers
+                            )
+                            break
+                        print(f"📭 Queue empty... checking again in 5s (attempt {empty_queue_count}/6)")
+                        await asyncio.sleep(5)
+                        continue
+                    
+                    empty_queue_count = 0  # Reset counter
+                    
+                    self._in_flight += len(tasks)
+                    for t in tasks:
+                        await self.fetch_q.put(t)
                 
-                # Process batch concurrently
-                await asyncio.gather(*[self.crawl_url(client, t) for t in tasks], return_exceptions=True)
+                # Let already-claimed tasks finish so none are left 'processing'
+                await self.fetch_q.join()
+                await self.save_q.join()
+            finally:
+                for stage in stages:
+                    stage.cancel()
+                # Let a flush that is mid-POST finish instead of cancelling it and losing the batch
+                stop_flushing.set()
+                await asyncio.gather(*flushers, return_exceptions=True)
+                await self.flush_links(client)
+                await self.flush_statuses(client)
+                await self.update_session_progress(client)
 
         print(f"✅ Worker finished! Crawled {self.pages_crawled} pages")
 
@@ -315,5 +564,12 @@ if __name__ == "__main__":
         print("   SUPABASE_SERVICE_ROLE_KEY")
         sys.exit(1)
     
+    try:
+        # libuv-based event loop, falls back to asyncio's default (e.g. on Windows)
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     worker = SaaSWorker(session_id, project_id)
     asyncio.run(worker.run())
@@ -6,7 +6,7 @@ This worker reads from the crawl_queue table and processes URLs indefinitely.
 It's crash-proof because all state is stored in the database.
 
 Requirements:
-    pip install httpx beautifulsoup4
+    pip install "httpx[http2]" lxml
 
 Environment Variables:
     SUPABASE_URL          - Your Supabase project URL
@@ -32,11 +32,13 @@ import asyncio
 import os
 import sys
 import re
+from collections import Counter
 from datetime import datetime
-from urllib.parse import urlparse, urljoin, urlunparse
+from urllib.parse import urlparse, urljoin, urlsplit, urlunparse
 from typing import Dict, List, Set, Optional
 import httpx
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 
 # ==================== CONFIGURATION ====================
 
@@ -60,6 +62,27 @@ HEADERS = {
 # User Agent
 USER_AGENT = "Mozilla/5.0 (compatible; InternalLinkOptimizer/1.0; +https://yoursite.com/bot)"
 
+# Page text stored in pages.content; the backend's compare-content and health
+# scoring read it, so it stays uncompressed text
+PAGE_CONTENT_CHARS = 10_000
+
+# Text analysis tables, built once at import
+_STOPWORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'is', 'was', 'are', 'were', 'been', 'be',
+    'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'should',
+    'can', 'could', 'may', 'might', 'this', 'that', 'these', 'those'
+})
+_NON_ALPHA_RE = re.compile(r'[^a-z\s]')
+_BLOG_URL_RE = re.compile(r'/(blog|article|post|news)/')
+_PRODUCT_URL_RE = re.compile(r'/(product|shop|item|buy)/')
+_CATEGORY_URL_RE = re.compile(r'/(category|collection|archive)/')
+_INFO_URL_RE = re.compile(r'/(about|team|company|contact)/')
+_BLOG_CONTENT_RE = re.compile(r'\b(posted|published|author|by)\b')
+_SKIP_HREF_PREFIXES = ('mailto:', 'tel:', 'javascript:', '#')
+_HREF_XPATH = etree.XPath('//a/@href', smart_strings=False)
+_HTML_PARSERS = {}  # charset -> lxml HTMLParser
+
 # ==================== UTILITY FUNCTIONS ====================
 
 def normalize_url(url: str) -> str:
@@ -76,28 +99,38 @@ def normalize_url(url: str) -> str:
     ))
     return normalized
 
+def html_parser(encoding: Optional[str]) -> Optional[lxml.html.HTMLParser]:
+    """Cached parser decoding with the response charset; None lets lxml sniff <meta charset>"""
+    if encoding not in _HTML_PARSERS:
+        try:
+            _HTML_PARSERS[encoding] = lxml.html.HTMLParser(encoding=encoding) if encoding else None
+        except LookupError:  # unknown charset name, let lxml detect it
+            _HTML_PARSERS[encoding] = None
+    return _HTML_PARSERS[encoding]
+
+def resolve_href(base, base_url: str, href: str) -> Optional[str]:
+    """Resolve an href against a page URL already split with urlsplit (None for mailto:, #, ...)"""
+    href = href.strip()
+    if not href or href.startswith(_SKIP_HREF_PREFIXES):
+        return None
+    # Absolute and root-relative hrefs don't need the pure-Python urljoin
+    if href.startswith(('http://', 'https://')):
+        return href
+    if href.startswith('/') and not href.startswith('//'):
+        return f"{base.scheme}://{base.netloc}{href}"
+    return urljoin(base_url, href)
+
 def extract_keywords(text: str, max_keywords: int = 10) -> List[str]:
     """Simple keyword extraction from text"""
     # Remove HTML, special chars, convert to lowercase
-    clean_text = re.sub(r'[^a-z\s]', ' ', text.lower())
+    clean_text = _NON_ALPHA_RE.sub(' ', text.lower())
     words = clean_text.split()
     
     # Remove stop words
-    stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-                  'of', 'with', 'by', 'from', 'is', 'was', 'are', 'were', 'been', 'be',
-                  'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'should',
-                  'can', 'could', 'may', 'might', 'this', 'that', 'these', 'those'}
+    filtered = [w for w in words if w not in _STOPWORDS and len(w) > 3]
     
-    filtered = [w for w in words if w not in stop_words and len(w) > 3]
-    
-    # Count frequency
-    freq: Dict[str, int] = {}
-    for word in filtered:
-        freq[word] = freq.get(word, 0) + 1
-    
-    # Sort by frequency and return top N
-    sorted_words = sorted(freq.items(), key=lambda x: x[1], reverse=True)
-    return [word for word, count in sorted_words[:max_keywords]]
+    # Count frequency and return top N
+    return [word for word, count in Counter(filtered).most_common(max_keywords)]
 
 def classify_page_type(url: str, title: str, content: str) -> str:
     """Simple page type classification"""
@@ -106,19 +139,19 @@ def classify_page_type(url: str, title: str, content: str) -> str:
     content_lower = content.lower()
     
     # Check URL patterns
-    if re.search(r'/(blog|article|post|news)/', url_lower):
+    if _BLOG_URL_RE.search(url_lower):
         return 'blog'
-    if re.search(r'/(product|shop|item|buy)/', url_lower):
+    if _PRODUCT_URL_RE.search(url_lower):
         return 'product'
-    if re.search(r'/(category|collection|archive)/', url_lower):
+    if _CATEGORY_URL_RE.search(url_lower):
         return 'category'
-    if re.search(r'/(about|team|company|contact)/', url_lower):
+    if _INFO_URL_RE.search(url_lower):
         return 'informational'
     
     # Check content patterns
     if 'add to cart' in content_lower or 'buy now' in content_lower:
         return 'product'
-    if re.search(r'\b(posted|published|author|by)\b', content_lower):
+    if _BLOG_CONTENT_RE.search(content_lower):
         return 'blog'
     
     # Default
@@ -129,86 +162,84 @@ def classify_page_type(url: str, title: str, content: str) -> str:
 
 # ==================== DATABASE OPERATIONS ====================
 
-async def get_session_info() -> Optional[Dict]:
+# All helpers take the shared Supabase client created in worker_loop
+# (base_url=SUPABASE_URL, HEADERS preset), so connections are reused.
+
+async def get_session_info(client: httpx.AsyncClient) -> Optional[Dict]:
     """Get session details including project_id and start_url"""
-    url = f"{SUPABASE_URL}/rest/v1/crawl_sessions?id=eq.{SESSION_ID}&select=*"
-    async with httpx.AsyncClient() as client:
-        try:
-            res = await client.get(url, headers=HEADERS)
-            sessions = res.json()
-            return sessions[0] if sessions else None
-        except Exception as e:
-            print(f"❌ Error fetching session: {e}")
-            return None
-
-async def get_next_tasks(limit: int = 5) -> List[Dict]:
+    url = f"/rest/v1/crawl_sessions?id=eq.{SESSION_ID}&select=*"
+    try:
+        res = await client.get(url)
+        sessions = res.json()
+        return sessions[0] if sessions else None
+    except Exception as e:
+        print(f"❌ Error fetching session: {e}")
+        return None
+
+async def get_next_tasks(client: httpx.AsyncClient, limit: int = 5) -> List[Dict]:
     """Pull next pending URLs from the queue"""
-    url = f"{SUPABASE_URL}/rest/v1/crawl_queue?session_id=eq.{SESSION_ID}&status=eq.pending&order=depth.asc&limit={limit}"
-    async with httpx.AsyncClient() as client:
-        try:
-            res = await client.get(url, headers=HEADERS)
-            return res.json() if res.status_code == 200 else []
-        except Exception as e:
-            print(f"❌ Error fetching tasks: {e}")
-            return []
+    url = f"/rest/v1/crawl_queue?session_id=eq.{SESSION_ID}&status=eq.pending&order=depth.asc&limit={limit}"
+    try:
+        res = await client.get(url)
+        return res.json() if res.status_code == 200 else []
+    except Exception as e:
+        print(f"❌ Error fetching tasks: {e}")
+        return []
 
-async def update_task_status(task_id: str, status: str):
+async def update_task_status(client: httpx.AsyncClient, task_id: str, status: str):
     """Update queue item status"""
-    url = f"{SUPABASE_URL}/rest/v1/crawl_queue?id=eq.{task_id}"
-    async with httpx.AsyncClient() as client:
-        try:
-            await client.patch(url, json={"status": status}, headers=HEADERS)
-        except Exception as e:
-            print(f"⚠️  Warning: Could not update task status: {e}")
+    url = f"/rest/v1/crawl_queue?id=eq.{task_id}"
+    try:
+        await client.patch(url, json={"status": status})
+    except Exception as e:
+        print(f"⚠️  Warning: Could not update task status: {e}")
 
-async def save_page(page_data: Dict):
+async def save_page(client: httpx.AsyncClient, page_data: Dict):
     """Save crawled page to database"""
-    url = f"{SUPABASE_URL}/rest/v1/pages"
+    url = "/rest/v1/pages"
     
     # Use upsert to avoid duplicates
-    upsert_headers = {**HEADERS, "Prefer": "resolution=merge-duplicates"}
+    upsert_headers = {"Prefer": "resolution=merge-duplicates"}
     
-    async with httpx.AsyncClient() as client:
-        try:
-            res = await client.post(url, json=page_data, headers=upsert_headers)
-            if res.status_code >= 300:
-                print(f"⚠️  DB Save Warning: {res.text}")
-        except Exception as e:
-            print(f"❌ DB Save Error: {e}")
+    try:
+        res = await client.post(url, json=page_data, headers=upsert_headers)
+        if res.status_code >= 300:
+            print(f"⚠️  DB Save Warning: {res.text}")
+    except Exception as e:
+        print(f"❌ DB Save Error: {e}")
 
-async def enqueue_links(links: List[Dict]):
+async def enqueue_links(client: httpx.AsyncClient, links: List[Dict]):
     """Add discovered links to the queue"""
     if not links:
         return
     
-    url = f"{SUPABASE_URL}/rest/v1/crawl_queue"
+    url = "/rest/v1/crawl_queue"
     
     # Use ignore-duplicates to prevent re-crawling
-    upsert_headers = {**HEADERS, "Prefer": "resolution=ignore-duplicates"}
+    upsert_headers = {"Prefer": "resolution=ignore-duplicates"}
     
-    async with httpx.AsyncClient() as client:
-        try:
-            await client.post(url, json=links, headers=upsert_headers)
-        except Exception as e:
-            print(f"⚠️  Enqueue Warning: {e}")
+    try:
+        await client.post(url, json=links, headers=upsert_headers)
+    except Exception as e:
+        print(f"⚠️  Enqueue Warning: {e}")
 
-async def update_session_progress(pages_crawled: int, pages_found: int):
+async def update_session_progress(client: httpx.AsyncClient, pages_crawled: int, pages_found: int):
     """Update session with current progress"""
-    url = f"{SUPABASE_URL}/rest/v1/crawl_sessions?id=eq.{SESSION_ID}"
+    url = f"/rest/v1/crawl_sessions?id=eq.{SESSION_ID}"
     data = {
         "pages_crawled": pages_crawled,
         "pages_found": pages_found,
         "updated_at": datetime.utcnow().isoformat()
     }
-    async with httpx.AsyncClient() as client:
-        try:
-            await client.patch(url, json=data, headers=HEADERS)
-        except Exception as e:
-            print(f"⚠️  Progress update warning: {e}")
+    try:
+        await client.patch(url, json=data)
+    except Exception as e:
+        print(f"⚠️  Progress update warning: {e}")
 
 # ==================== CRAWLER LOGIC ====================
 
-async def crawl_url(task: Dict, session_info: Dict, domain: str) -> List[str]:
+async def crawl_url(db_client: httpx.AsyncClient, fetch_client: httpx.AsyncClient,
+                    task: Dict, session_info: Dict, domain: str) -> List[str]:
     """Crawl a single URL and return discovered links"""
     task_id = task['id']
     target_url = task['url']
@@ -218,119 +249,123 @@ async def crawl_url(task: Dict, session_info: Dict, domain: str) -> List[str]:
     project_id = session_info['project_id']
     max_depth = session_info.get('max_depth', 3)
     
-    await update_task_status(task_id, "processing")
+    await update_task_status(db_client, task_id, "processing")
     print(f"🔎 [{depth}] Crawling: {target_url}")
     
     discovered_links = []
     
     try:
-        async with httpx.AsyncClient(
-            timeout=15.0,
-            follow_redirects=True,
-            headers={"User-Agent": USER_AGENT}
-        ) as client:
-            response = await client.get(target_url)
-            
-            # Only process successful HTML responses
-            if response.status_code != 200:
-                print(f"⚠️  Non-200 status: {response.status_code}")
-                await update_task_status(task_id, "failed")
-                return []
-            
-            content_type = response.headers.get('content-type', '')
-            if 'text/html' not in content_type.lower():
-                print(f"⚠️  Non-HTML content: {content_type}")
-                await update_task_status(task_id, "completed")
-                return []
-            
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract metadata
-            title = soup.title.string if soup.title else "No Title"
-            title = title.strip()[:200]
-            
-            # Get text content
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "footer"]):
-                script.decompose()
-            
-            text_content = soup.get_text(separator=' ', strip=True)
-            word_count = len(text_content.split())
-            
-            # Extract keywords
-            keywords = extract_keywords(text_content)
-            
-            # Classify page type
-            page_type = classify_page_type(target_url, title, text_content)
-            
-            # Get meta description
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            description = meta_desc['content'][:300] if meta_desc and meta_desc.get('content') else ''
+        response = await fetch_client.get(target_url)
+        
+        # Only process successful HTML responses
+        if response.status_code != 200:
+            print(f"⚠️  Non-200 status: {response.status_code}")
+            await update_task_status(db_client, task_id, "failed")
+            return []
+        
+        content_type = response.headers.get('content-type', '')
+        if 'text/html' not in content_type.lower():
+            print(f"⚠️  Non-HTML content: {content_type}")
+            await update_task_status(db_client, task_id, "completed")
+            return []
+        
+        if not response.content.strip():
+            print("⚠️  Empty page")
+            await update_task_status(db_client, task_id, "completed")
+            return []
+        
+        # Parse HTML (lxml ignores the HTTP header charset unless told)
+        tree = lxml.html.fromstring(response.content, parser=html_parser(response.charset_encoding))
+        
+        # Extract metadata
+        title = tree.findtext('.//title')
+        title = (title if title is not None else "No Title").strip()[:200]
+        
+        # Get meta description
+        description = tree.xpath('string(//meta[@name="description"]/@content)')[:300]
+        
+        # Read links before nav/footer are stripped below, so nav-only pages are still found
+        hrefs = _HREF_XPATH(tree)
+        
+        # Get text content
+        # Remove script and style elements (one pass, no per-node decompose)
+        etree.strip_elements(tree, etree.Comment, 'script', 'style', 'nav', 'footer', with_tail=False)
+        
+        words = ' '.join(tree.itertext()).split()
+        text_content = ' '.join(words)
+        word_count = len(words)
+        
+        # Extract keywords
+        keywords = extract_keywords(text_content)
+        
+        # Classify page type
+        page_type = classify_page_type(target_url, title, text_content)
+        
+        # Extract internal links
+        internal_links: Set[str] = set()
+        base = urlsplit(target_url)
+        for href in hrefs:
+            full_url = resolve_href(base, target_url, href)
+            if full_url is None:
+                continue
             
-            # Extract internal links
-            internal_links: Set[str] = set()
-            for anchor in soup.find_all('a', href=True):
-                href = anchor['href']
-                full_url = urljoin(target_url, href)
+            # Only keep internal links from same domain (checked before normalizing)
+            if urlsplit(full_url).netloc.lower() == domain:
                 normalized = normalize_url(full_url)
-                
-                # Only keep internal links from same domain
-                if urlparse(normalized).netloc == domain:
-                    internal_links.add(normalized)
-                    discovered_links.append(normalized)
-            
-            # Calculate link equity (simplified)
-            link_equity = min(100, (len(internal_links) * 5))
-            
-            # Prepare page data
-            page_data = {
-                "project_id": project_id,
-                "session_id": SESSION_ID,
-                "url": target_url,
-                "normalized_url": normalize_url(target_url),
-                "title": title,
-                "content": text_content[:10000],  # Store first 10k chars
-                "word_count": word_count,
-                "internal_links_count": len(internal_links),
-                "external_links_count": 0,  # Could count these too
-                "status_code": response.status_code,
-                "depth": depth,
-                "parent_url": parent_url,
-                "page_type": page_type,
-                "meta_description": description,
-                "keywords": keywords[:10] if keywords else [],
-                "link_equity_score": link_equity,
-                "crawled_at": datetime.utcnow().isoformat()
-            }
-            
-            # Save to database
-            await save_page(page_data)
-            
-            # Enqueue discovered links (if within depth limit)
-            if depth < max_depth and internal_links:
-                links_to_enqueue = [
-                    {
-                        "session_id": SESSION_ID,
-                        "url": link,
-                        "normalized_url": normalize_url(link),
-                        "depth": depth + 1,
-                        "parent_url": target_url,
-                        "status": "pending"
-                    }
-                    for link in internal_links
-                ]
-                await enqueue_links(links_to_enqueue)
-            
-            await update_task_status(task_id, "completed")
-            print(f"✅ Completed: {target_url} ({len(internal_links)} links found)")
-            
+                internal_links.add(normalized)
+                discovered_links.append(normalized)
+        
+        # Calculate link equity (simplified)
+        link_equity = min(100, (len(internal_links) * 5))
+        
+        # Prepare page data
+        page_data = {
+            "project_id": project_id,
+            "session_id": SESSION_ID,
+            "url": target_url,
+            "normalized_url": normalize_url(target_url),
+            "title": title,
+            "content": text_content[:PAGE_CONTENT_CHARS],
+            "word_count": word_count,
+            "internal_links_count": len(internal_links),
+            "external_links_count": 0,  # Could count these too
+            "status_code": response.status_code,
+            "depth": depth,
+            "parent_url": parent_url,
+            "page_type": page_type,
+            "meta_description": description,
+            "keywords": keywords[:10] if keywords else [],
+            "link_equity_score": link_equity,
+            "crawled_at": datetime.utcnow().isoformat()
+        }
+        
+        # Save to database
+        await save_page(db_client, page_data)
+        
+        # Enqueue discovered links (if within depth limit)
+        if depth < max_depth and internal_links:
+            links_to_enqueue = [
+                {
+                    "session_id": SESSION_ID,
+                    "url": link,
+                    "normalized_url": normalize_url(link),
+                    "depth": depth + 1,
+                    "parent_url": target_url,
+                    "status": "pending"
+                }
+                for link in internal_links
+            ]
+            await enqueue_links(db_client, links_to_enqueue)
+        
+        await update_task_status(db_client, task_id, "completed")
+        print(f"✅ Completed: {target_url} ({len(internal_links)} links found)")
+        
     except asyncio.TimeoutError:
         print(f"⏱️  Timeout: {target_url}")
-        await update_task_status(task_id, "failed")
+        await update_task_status(db_client, task_id, "failed")
     except Exception as e:
         print(f"❌ Error crawling {target_url}: {e}")
-        await update_task_status(task_id, "failed")
+        await update_task_status(db_client, task_id, "failed")
     
     return discovered_links
 
@@ -343,8 +378,32 @@ async def worker_loop():
     print("🚀 Internal Link Optimizer - Crawler Worker")
     print("=" * 60)
     
+    # Long-lived pooled clients: one for Supabase, one for crawling target sites
+    db_client = httpx.AsyncClient(
+        base_url=SUPABASE_URL,
+        headers=HEADERS,
+        http2=True,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=50, keepalive_expiry=60.0),
+        timeout=httpx.Timeout(15.0, connect=5.0)
+    )
+    fetch_client = httpx.AsyncClient(
+        headers={"User-Agent": USER_AGENT},
+        follow_redirects=True,
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=60.0),
+        timeout=httpx.Timeout(15.0, connect=5.0)
+    )
+    
+    try:
+        await crawl_session(db_client, fetch_client)
+    finally:
+        await db_client.aclose()
+        await fetch_client.aclose()
+
+async def crawl_session(db_client: httpx.AsyncClient, fetch_client: httpx.AsyncClient):
+    """Crawl SESSION_ID until the queue is empty or max_pages is reached"""
     # Get session info
-    session_info = await get_session_info()
+    session_info = await get_session_info(db_client)
     if not session_info:
         print("❌ Error: Session not found")
         sys.exit(1)
@@ -368,7 +427,7 @@ async def worker_loop():
     
     while pages_crawled < max_pages:
         # Get next batch of tasks
-        tasks = await get_next_tasks(limit=5)
+        tasks = await get_next_tasks(db_client, limit=5)
         
         if not tasks:
             consecutive_empty += 1
@@ -386,20 +445,20 @@ async def worker_loop():
             if pages_crawled >= max_pages:
                 break
             
-            links_found = await crawl_url(task, session_info, domain)
+            links_found = await crawl_url(db_client, fetch_client, task, session_info, domain)
             pages_crawled += 1
             total_links_found += len(links_found)
             
-            # Update progress every 10 pages
+            # Update progress every 10 pages (this loop is sequential, so that is already coarse)
             if pages_crawled % 10 == 0:
-                await update_session_progress(pages_crawled, total_links_found)
+                await update_session_progress(db_client, pages_crawled, total_links_found)
                 print(f"📊 Progress: {pages_crawled}/{max_pages} pages crawled")
             
             # Small delay to be polite
             await asyncio.sleep(0.5)
     
     # Final progress update
-    await update_session_progress(pages_crawled, total_links_found)
+    await update_session_progress(db_client, pages_crawled, total_links_found)
     
     print()
     print("=" * 60)
@@ -411,6 +470,13 @@ async def worker_loop():
 # ==================== ENTRY POINT ====================
 
 if __name__ == "__main__":
+    try:
+        # libuv-based event loop, falls back to asyncio's default (e.g. on Windows)
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     try:
         asyncio.run(worker_loop())
     except KeyboardInterrupt: